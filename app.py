@@ -1,7 +1,15 @@
 # app.py
 import streamlit as st
-from utils.io import load_data
-from utils.prep import cleaning
+from utils.cache import filter_signature
+from utils.filters import age_group_options, filter_predicates, normalize_search
+from utils.geo import search_communes
+from utils.io import (
+    load_backend, load_communes, load_cube, load_filter_engine, load_name_index, load_prewarmed, load_text_index,
+    make_selection,
+    BACKEND, DASHBOARD_COLUMNS,
+)
+from utils.prep import build_error, build_status, dataset_period, dataset_version, load_manifest, start_cleaning
+from utils.profiling import stage, start_profiling
 st.set_page_config(page_title="Deaths in France Analysis", layout="wide")
 
 st.set_page_config(page_title="Deaths in France Analysis", layout="wide")
@@ -11,76 +19,115 @@ from sections.overview import display_overview
 from sections.deep_dives import display_deep_dives
 from sections.conclusion import display_conclusion
 
+@st.fragment(run_every=2)
+def display_build_progress(version):
+    """Per-file progress of the background build; reruns the app when a partition is ready."""
+    status = build_status()
+    done = sum(rows is not None for rows in status.values())
+    st.sidebar.progress(done / len(status), text=f"Preparing data: {done}/{len(status)} files ready")
+    for name, rows in status.items():
+        st.sidebar.caption(f"✅ {name}: {rows:,} deaths" if rows is not None else f"⏳ {name}")
+    if dataset_version(load_manifest()) != version:
+        st.rerun()
+
 def prepare_and_load_data():
-    import os
-    from pathlib import Path
-    parquet_path = Path(__file__).resolve().parent / "data" / "Deces_cleaned.parquet"
-    if parquet_path.exists():
-        return load_data()
-    else:
-        cleaning()
-        return load_data()
+    manifest = load_manifest()
+    version = dataset_version(manifest)
+    if None in build_status().values():
+        # The build runs in the background; the years already cleaned are served meanwhile
+        error = build_error()
+        if error and not manifest['files']:
+            st.error(f"Data preparation failed:\n\n{error}")
+            st.stop()
+        if error:
+            # Retried once the source files change; the years cleaned before the failure are served meanwhile
+            st.warning(f"Data preparation failed, only the years ready so far are shown:\n\n{error}")
+        else:
+            start_cleaning()
+            display_build_progress(version)
+            if not manifest['files']:
+                st.info("Preparing the data for the first time. The dashboard appears as soon as the first year is ready.")
+                st.stop()
+    # The out-of-core backend never loads the rows
+    return version, None if BACKEND == 'dataset' else load_filter_engine(version)
+
+# ?profile=1 (or DECES_PROFILE=1) times the stages of each rerun
+profiler = start_profiling(st.query_params.get('profile') == '1')
 
-df = prepare_and_load_data()
+with stage('load data'):
+    version, engine = prepare_and_load_data()
+    # Years of the ingested files, for the titles
+    period = dataset_period(load_manifest())
+    # Age bounds and genders come from the cube, which is small whatever the backend
+    cube_counts = load_cube(version)['generation']
+    # Chart aggregates precomputed by `python -m utils.prewarm`, if any
+    load_prewarmed(version)
+
+# Section navigation: only the selected section is computed on each rerun
+SECTIONS = ["Introduction", "Overview", "Deep Dives", "Conclusion"]
+selected_section = st.sidebar.radio("Section", SECTIONS)
 
 # Sidebar with filters
 st.sidebar.header("Filters")
 
-# Year filter
-min_year, max_year = 2020, 2022
-min_age, max_age = int(df['age'].min()), int(df['age'].max())
+min_age, max_age = int(cube_counts['age'].min()), int(cube_counts['age'].max())
 
 # Gender filter
-gender_options = ['All'] + df['sexeCategorical'].unique().tolist()
+gender_options = ['All'] + cube_counts['sexeCategorical'].unique().tolist()
 selected_gender = st.sidebar.selectbox("Gender", gender_options)
 
 # Filter by place of birth
-commune_input = st.sidebar.text_input("Search for a place of birth")
+commune_input = normalize_search(st.sidebar.text_input("Search for a place of birth"))
 # Filter by first name
-prenom_input = st.sidebar.text_input("Search for a first name")
+prenom_input = normalize_search(st.sidebar.text_input("Search for a first name"))
 # Check a box for exclusive first name filtering
 exclusive_prenom = st.sidebar.checkbox("Exclusive first name filtering")
-# Filter by year of birth
-min_birth_year, max_birth_year = int(df['annee_naiss'].min()), int(df['annee_naiss'].max())
-
-age_group_options = {
-    'All': (min_age, max_age),
-    '90 and more': (90, max_age),
-    '75-89': (75, 89),
-    '60-74': (60, 74),
-    '40-59': (40, 59),
-    '20-39': (20, 39),
-    '20 and less': (0, 19)
-}
-selected_age_group = st.sidebar.selectbox("Age Group", list(age_group_options.keys()))
-age_range = age_group_options[selected_age_group]
+
+age_groups = age_group_options(min_age, max_age)
+selected_age_group = st.sidebar.selectbox("Age Group", list(age_groups.keys()))
+age_range = age_groups[selected_age_group]
 
 # Filters
-df_filtered = df[(df['annee_deces'] >= 2020) & (df['annee_deces'] <= 2022)]
+# (cleaning() already restricted the data to deaths from 2020 on)
+# Apply place of birth filter if user entered text, resolved once to the matching commune names
+communes = None
+if commune_input:
+    with stage('place of birth search'):
+        communes = search_communes(load_communes(version), commune_input)
+predicates = filter_predicates(
+    selected_gender, None if selected_age_group == 'All' else age_range, prenom_input, exclusive_prenom, communes,
+)
 
-if selected_gender != 'All':
-    df_filtered = df_filtered[df_filtered['sexeCategorical'] == selected_gender]
+# The charts' aggregates are cached on the filters and the dataset version, not on the rows
+selection_key = (
+    filter_signature(selected_gender, selected_age_group, prenom_input, commune_input, exclusive_prenom),
+    version,
+)
+selection = make_selection(
+    version, engine, selection_key, predicates, selected_gender, age_range, prenom_input, commune_input,
+)
 
-# Apply place of birth filter if user entered text
-if commune_input:
-    df_filtered = df_filtered[df_filtered['commnaiss'].str.contains(commune_input, case=False, na=False)]
-# Apply first name filter if user entered text
 if prenom_input and not exclusive_prenom:
-    df_filtered = df_filtered[df_filtered['prenom'].str.contains(prenom_input, case=False, na=False)]
     # Display the list of matching first names
-    matching_prenoms = df[df['prenom'].str.contains(prenom_input, case=False, na=False)]['prenom'].unique()
+    if engine is None:
+        # No rows are loaded: the names come from the per-name statistics, without a scan
+        prenom_index = load_name_index(version)
+    else:
+        prenom_index = load_text_index(version, 'prenom')
+    matching_prenoms = prenom_index.values[prenom_index.search(prenom_input)]
     st.sidebar.write("Matching first names:", matching_prenoms)
-elif prenom_input and exclusive_prenom:
-    #Only take people with this exact first name
-    df_filtered = df_filtered[df_filtered['prenom'] == str.upper(prenom_input)]
-
-if selected_age_group != 'All':
-    df_filtered = df_filtered[
-        (df_filtered['age'] >= age_range[0]) & (df_filtered['age'] <= age_range[1])
-    ]
 
 # --- Sections ---
-display_intro(df)
-display_overview(df_filtered)
-display_deep_dives(df_filtered)
-display_conclusion()
\ No newline at end of file
+with stage(f'section {selected_section}'):
+    if selected_section == "Introduction":
+        display_intro(load_backend(version).head(DASHBOARD_COLUMNS) if engine is None else engine.df, period)
+    elif selected_section == "Overview":
+        display_overview(selection, period)
+    elif selected_section == "Deep Dives":
+        display_deep_dives(selection, period)
+    else:
+        display_conclusion()
+
+if profiler is not None:
+    profiler.display()
+    profiler.log(section=selected_section, filters=selection_key[0], version=version)
@@ -0,0 +1,140 @@
+"""Write synthetic INSEE-shaped death files (Deces_YYYY.csv) for the benchmarks.
+
+    python benchmarks/generate.py --rows 10000000 --out /tmp/deces
+
+The files follow the layout and quirks of the INSEE "fichier des personnes
+décédées": `NOM*PRENOMS/` names, unknown (00) birth days and months,
+duplicated records, missing places of birth, births abroad (99xxx codes) and
+deaths registered the year after. Everything is drawn from a seeded RNG, so a
+given scale always produces the same files.
+"""
+import argparse
+import csv
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.geo import DEPARTMENT_NAMES  # noqa: E402
+
+COLUMNS = ['nomprenom', 'sexe', 'datenaiss', 'lieunaiss', 'commnaiss', 'paysnaiss', 'datedeces', 'lieudeces', 'actedeces']
+FIRST_NAMES = [
+    'MARIE', 'JEAN', 'PIERRE', 'MICHEL', 'ANDRE', 'JEANNE', 'FRANCOISE', 'MONIQUE', 'LOUIS', 'ANNE',
+    'JACQUES', 'BERNARD', 'GEORGES', 'RENE', 'ROGER', 'SIMONE', 'YVONNE', 'PAULETTE', 'MARCEL', 'ROBERT',
+    'DENISE', 'GERMAINE', 'SUZANNE', 'CLAUDE', 'HENRI', 'PAUL', 'JOSEPH', 'MADELEINE', 'ODETTE', 'LUCIEN',
+    'COLETTE', 'RAYMOND', 'GERARD', 'DANIEL', 'ALAIN', 'PHILIPPE', 'NICOLE', 'CHRISTIANE', 'ANDREE', 'THERESE',
+    'ALBERT', 'FERNAND', 'MAURICE', 'LUCIENNE', 'GISELE', 'JACQUELINE', 'DANIELLE', 'SYLVIE', 'PATRICK', 'CHRISTIAN',
+    'THIBAULT', 'NICOLAS', 'JULIEN', 'CAMILLE', 'LEA', 'LUCAS', 'EMMA', 'HUGO', 'CHLOE', 'NATHAN',
+]
+LAST_NAMES = [
+    'MARTIN', 'BERNARD', 'THOMAS', 'PETIT', 'ROBERT', 'RICHARD', 'DURAND', 'DUBOIS', 'MOREAU', 'LAURENT',
+    'SIMON', 'MICHEL', 'LEFEBVRE', 'LEROY', 'ROUX', 'DAVID', 'BERTRAND', 'MOREL', 'FOURNIER', 'GIRARD',
+    'BONNET', 'DUPONT', 'LAMBERT', 'FONTAINE', 'ROUSSEAU', 'VINCENT', 'MULLER', 'LEFEVRE', 'FAURE', 'ANDRE',
+]
+COUNTRIES = ['ALGERIE', 'MAROC', 'PORTUGAL', 'ITALIE', 'ESPAGNE', 'TUNISIE', 'POLOGNE', 'BELGIQUE', 'ALLEMAGNE', 'VIETNAM']
+NAME_PREFIXES = ['SAINT-', 'LE ', 'LA ', '']
+NAME_STEMS = ['VILLENEUVE', 'MONTIGNY', 'BOIS', 'FONTAINE', 'VAL', 'BEAUMONT', 'CHATEAUNEUF', 'ROCHE', 'PLESSIS', 'MESNIL']
+# Months of death, winter-heavy like the real series
+MONTH_WEIGHTS = np.array([11, 9, 9, 8, 8, 7, 8, 7, 7, 8, 8, 10], dtype=float)
+
+
+def communes(rng, per_department=60):
+    """Synthetic commune codes and names: per_department communes in every department."""
+    codes, names = [], []
+    for dept in DEPARTMENT_NAMES:
+        width = 5 - len(dept)
+        for i in range(1, per_department + 1):
+            codes.append(f"{dept}{i:0{width}d}")
+            names.append(f"{rng.choice(NAME_PREFIXES)}{rng.choice(NAME_STEMS)}-{dept}-{i}")
+    # Big cities keep their real name and code
+    codes += ['75056', '13055', '69123', '31555', '06088', '44109', '67482', '34172', '33063', '59350']
+    names += ['PARIS', 'MARSEILLE', 'LYON', 'TOULOUSE', 'NICE', 'NANTES', 'STRASBOURG', 'MONTPELLIER', 'BORDEAUX', 'LILLE']
+    # Shuffled, so the most frequent communes (see zipf_choice) are spread over the departments
+    order = rng.permutation(len(codes))
+    return np.array(codes)[order], np.array(names)[order]
+
+
+def zipf_choice(rng, n_values, size, exponent=1.1):
+    """Indices in [0, n_values) drawn with Zipf-like weights (a few very frequent values)."""
+    weights = 1 / np.arange(1, n_values + 1) ** exponent
+    return rng.choice(n_values, size=size, p=weights / weights.sum())
+
+
+def generate_chunk(rng, year, size, commune_codes, commune_names) -> pd.DataFrame:
+    # Death dates, 3% registered in the file of the following year
+    death_year = np.where(rng.random(size) < 0.03, year - 1, year)
+    month = rng.choice(12, size=size, p=MONTH_WEIGHTS / MONTH_WEIGHTS.sum()) + 1
+    day = rng.integers(1, 29, size)
+    death = pd.DatetimeIndex(pd.to_datetime({'year': death_year, 'month': month, 'day': day}))
+
+    # Ages at death: mostly old, with a small share of infant deaths
+    age = np.clip(rng.normal(79, 13, size), 1, 108).astype(int)
+    age[rng.random(size) < 0.01] = 0
+    birth = death - pd.to_timedelta(age * 365.25 + rng.integers(0, 365, size), unit='D')
+    birth_day = birth.day.to_numpy().copy()
+    birth_month = birth.month.to_numpy().copy()
+    # Unknown birth day or month are written as 00
+    birth_day[rng.random(size) < 0.01] = 0
+    birth_month[rng.random(size) < 0.003] = 0
+
+    first = np.array(FIRST_NAMES)[zipf_choice(rng, len(FIRST_NAMES), size)]
+    second = np.array(FIRST_NAMES)[zipf_choice(rng, len(FIRST_NAMES), size)]
+    compound = rng.random(size) < 0.3
+    prenoms = np.where(compound, np.char.add(np.char.add(first, ' '), second), first)
+    last = np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), size)]
+
+    # Places of birth: 8% abroad, 2% without commune name, 0.1% without any place
+    birthplace = zipf_choice(rng, len(commune_codes), size)
+    lieunaiss = commune_codes[birthplace].astype(object)
+    commnaiss = commune_names[birthplace].astype(object)
+    paysnaiss = np.full(size, '', dtype=object)
+    abroad = rng.random(size) < 0.08
+    country = rng.integers(0, len(COUNTRIES), abroad.sum())
+    lieunaiss[abroad] = np.char.add('99', (100 + country * 11).astype(str))
+    commnaiss[abroad] = np.array(COUNTRIES)[country]
+    paysnaiss[abroad] = np.array(COUNTRIES)[country]
+    commnaiss[rng.random(size) < 0.02] = ''
+    lieunaiss[rng.random(size) < 0.001] = ''
+
+    return pd.DataFrame({
+        'nomprenom': pd.Series(last, dtype=object) + '*' + prenoms + '/',
+        'sexe': rng.integers(1, 3, size),
+        'datenaiss': (birth.year.to_numpy() * 10000 + birth_month * 100 + birth_day).astype(str),
+        'lieunaiss': lieunaiss,
+        'commnaiss': commnaiss,
+        'paysnaiss': paysnaiss,
+        'datedeces': (death_year * 10000 + month * 100 + day).astype(str),
+        'lieudeces': commune_codes[zipf_choice(rng, len(commune_codes), size)],
+        'actedeces': rng.integers(1, 9999, size).astype(str),
+    }, columns=COLUMNS)
+
+
+def generate(out: Path, rows: int, years=(2020, 2021, 2022), seed=0, chunk_size=1_000_000, duplicates=0.005):
+    """Write len(years) files holding `rows` records in total (plus the duplicates)."""
+    rng = np.random.default_rng(seed)
+    out.mkdir(parents=True, exist_ok=True)
+    commune_codes, commune_names = communes(rng)
+    for year in years:
+        path = out / f"Deces_{year}.csv"
+        remaining = rows // len(years)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.write(';'.join(f'"{c}"' for c in COLUMNS) + '\n')
+            while remaining:
+                size = min(chunk_size, remaining)
+                chunk = generate_chunk(rng, year, size, commune_codes, commune_names)
+                # Some records appear twice in the INSEE files
+                chunk = pd.concat([chunk, chunk.sample(frac=duplicates, random_state=int(rng.integers(1 << 31)))])
+                chunk.to_csv(f, sep=';', header=False, index=False, quoting=csv.QUOTE_ALL)
+                remaining -= size
+        print(f"Wrote {path} ({rows // len(years):,} records)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help="records in total, e.g. 1000000, 10000000 or 30000000")
+    parser.add_argument('--years', type=int, nargs='+', default=[2020, 2021, 2022])
+    parser.add_argument('--out', type=Path, required=True, help="directory the CSV files are written to")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.out, args.rows, args.years, args.seed)
@@ -0,0 +1,295 @@
+"""Replay concurrent dashboard sessions against a local server and report rerun latency and memory.
+
+    python benchmarks/generate.py --rows 1000000 --out /tmp/deces
+    python benchmarks/loadtest.py --data /tmp/deces --sessions 1 4 16 --interactions 20
+
+Each level starts a headless `streamlit run app.py` on a free local port, and
+each simulated session is a websocket client of it that sends what a browser
+tab would: it opens the Overview, then makes random sidebar changes: gender,
+age group, typing or clearing a first-name search, toggling the exclusive
+filter and switching between the Overview and the Deep Dives. The sessions of
+a level run at the same time against the one server process, sharing its
+caches like the sessions of one deployed worker. For each session count, the
+harness reports the p50/p95 rerun latency (from the widget change to the end
+of the rerun), the reruns per second and the RSS of the server, which shows
+work that serializes the sessions and memory that grows with them. A rerun
+that raises, and a session that times out or loses its connection, are
+counted in the errors; the other sessions carry on. Everything runs offline;
+each level starts from a fresh server, so from empty chart caches.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+from generate import FIRST_NAMES  # noqa: E402
+
+# Widgets the sessions read and set, by their element type
+WIDGET_TYPES = ('selectbox', 'radio', 'text_input', 'checkbox')
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """Headless `streamlit run app.py` on a free local port, for the duration of a `with` block."""
+
+    def __init__(self, timeout=120):
+        self.port = free_port()
+        self.timeout = timeout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', str(ROOT / 'app.py'), '--server.headless', 'true',
+             '--server.port', str(self.port), '--server.fileWatcherType', 'none',
+             '--browser.gatherUsageStats', 'false', '--logger.level', 'error'],
+            cwd=ROOT, stdout=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{self.port}/_stcore/health', timeout=1) as response:
+                    if response.read() == b'ok':
+                        return self
+            except OSError:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.__exit__()
+                raise RuntimeError("The Streamlit server did not start")
+            time.sleep(0.2)
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        return False
+
+    def memory_mb(self, field: str):
+        """VmRSS (current) or VmHWM (maximum) RSS of the server in MB, or None where /proc is not available."""
+        try:
+            status = Path(f'/proc/{self.process.pid}/status').read_text()
+        except OSError:
+            return None
+        kilobytes = next(int(line.split()[1]) for line in status.splitlines() if line.startswith(field + ':'))
+        return round(kilobytes / 1024, 1)
+
+
+class Session:
+    """One browser tab: reruns app.py on the server with the widget values it changed so far."""
+
+    def __init__(self, websocket, timeout):
+        self._websocket = websocket
+        self._timeout = timeout
+        # label -> (widget type, id, options); label -> current value
+        self._widgets, self.values = {}, {}
+        # Every widget changed so far, sent with each rerun as the browser does
+        self._states = {}
+
+    def options(self, label: str) -> list:
+        return self._widgets[label][2]
+
+    def set(self, label: str, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        kind, widget_id, _ = self._widgets[label]
+        state = WidgetState(id=widget_id)
+        if kind == 'checkbox':
+            state.bool_value = value
+        else:
+            state.string_value = value
+        self._states[widget_id] = state
+        self.values[label] = value
+
+    def _found(self, kind: str, widget):
+        options = list(widget.options) if kind in ('selectbox', 'radio') else None
+        self._widgets[widget.label] = (kind, widget.id, options)
+        if widget.label not in self.values:
+            self.values[widget.label] = options[widget.default] if options else widget.default
+
+    async def rerun(self) -> bool:
+        """Rerun the script and read its output; False when the rerun raised."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.widget_states.widgets.extend(self._states.values())
+        await self._websocket.send(message.SerializeToString())
+        failed = False
+        while True:
+            reply = ForwardMsg()
+            reply.ParseFromString(await asyncio.wait_for(self._websocket.recv(), self._timeout))
+            kind = reply.WhichOneof('type')
+            if kind == 'delta' and reply.delta.WhichOneof('type') == 'new_element':
+                element = reply.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    failed = True
+                elif element_type in WIDGET_TYPES:
+                    self._found(element_type, getattr(element, element_type))
+            elif kind == 'script_finished' and reply.script_finished != ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY:
+                return not failed and reply.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY
+
+
+def change_gender(session, rng):
+    session.set("Gender", rng.choice([option for option in session.options("Gender") if option != session.values["Gender"]]))
+
+
+def change_age_group(session, rng):
+    options = [option for option in session.options("Age Group") if option != session.values["Age Group"]]
+    session.set("Age Group", rng.choice(options))
+
+
+def type_first_name(session, rng):
+    # Mostly the first letters of a name, as typed in the search box, sometimes a cleared box
+    label = "Search for a first name"
+    session.set(label, '' if session.values[label] and rng.random() < 0.3 else rng.choice(FIRST_NAMES)[:rng.randint(2, 6)].lower())
+
+
+def toggle_exclusive(session, rng):
+    label = "Exclusive first name filtering"
+    session.set(label, not session.values[label])
+
+
+def switch_section(session, rng):
+    session.set("Section", "Deep Dives" if session.values["Section"] == "Overview" else "Overview")
+
+
+# Interactions and how often users make them
+INTERACTIONS = {
+    'gender': (change_gender, 3),
+    'age group': (change_age_group, 3),
+    'first name': (type_first_name, 4),
+    'exclusive': (toggle_exclusive, 1),
+    'section': (switch_section, 1),
+}
+
+
+async def session(port, seed, interactions, timeout):
+    """Replay one session; returns its reruns as (interaction, seconds, error) and whether it failed."""
+    from websockets.asyncio.client import connect
+    rng = random.Random(seed)
+    names = list(INTERACTIONS)
+    weights = [weight for _, weight in INTERACTIONS.values()]
+    reruns = []
+    try:
+        async with connect(f'ws://127.0.0.1:{port}/_stcore/stream', subprotocols=['streamlit'], max_size=None) as ws:
+            tab = Session(ws, timeout)
+
+            async def rerun(name):
+                began = time.perf_counter()
+                ok = await tab.rerun()
+                reruns.append((name, time.perf_counter() - began, not ok))
+
+            await rerun('open')
+            tab.set("Section", "Overview")
+            await rerun('section')
+            for name in rng.choices(names, weights, k=interactions):
+                INTERACTIONS[name][0](tab, rng)
+                await rerun(name)
+    except Exception as error:
+        # Timeouts, lost connections, widgets missing from a broken page...: the other sessions carry on
+        print(f"session {seed} failed after {len(reruns)} reruns: {error!r}", file=sys.stderr)
+        return reruns, True
+    return reruns, False
+
+
+async def run_sessions(port, sessions, interactions, timeout, seed):
+    return await asyncio.gather(*(session(port, seed + i, interactions, timeout) for i in range(sessions)))
+
+
+def load_level(sessions, interactions, timeout, seed) -> dict:
+    """Run `sessions` sessions at once against a fresh server and summarize their reruns."""
+    with Server(timeout) as server:
+        # Load the data once first, so that the level does not time the server's startup
+        asyncio.run(run_sessions(server.port, 1, 0, timeout, seed))
+        rss_before = server.memory_mb('VmRSS')
+        began = time.perf_counter()
+        results = asyncio.run(run_sessions(server.port, sessions, interactions, timeout, seed))
+        elapsed = time.perf_counter() - began
+        rss_after, max_rss = server.memory_mb('VmRSS'), server.memory_mb('VmHWM')
+    reruns = [rerun for session_reruns, _ in results for rerun in session_reruns]
+    failed = sum(failed for _, failed in results)
+    seconds = np.array([rerun[1] for rerun in reruns]) if reruns else np.full(1, np.nan)
+    by_interaction = {}
+    for name, duration, _ in reruns:
+        by_interaction.setdefault(name, []).append(duration)
+    return {
+        'sessions': sessions,
+        'reruns': len(reruns),
+        'errors': sum(rerun[2] for rerun in reruns) + failed,
+        'failed_sessions': failed,
+        'p50_ms': round(np.percentile(seconds, 50) * 1000, 1),
+        'p95_ms': round(np.percentile(seconds, 95) * 1000, 1),
+        'max_ms': round(seconds.max() * 1000, 1),
+        'reruns_per_s': round(len(reruns) / elapsed, 2),
+        'rss_before_mb': rss_before,
+        'rss_after_mb': rss_after,
+        'max_rss_mb': max_rss,
+        'p95_ms_by_interaction': {
+            name: round(np.percentile(durations, 95) * 1000, 1) for name, durations in by_interaction.items()
+        },
+    }
+
+
+def run(levels, interactions, timeout=120, seed=0) -> list:
+    # Imported here, once DECES_DATA_DIR points at the load-test data
+    from utils.prep import cleaning
+
+    # Prepare the data up front, so that the sessions never wait on the build
+    cleaning(append=True)
+    print(f"{'sessions':>8} {'reruns':>7} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'reruns/s':>9} {'RSS MB':>9}")
+    results = []
+    for sessions in levels:
+        level = load_level(sessions, interactions, timeout, seed)
+        results.append(level)
+        print(f"{sessions:>8} {level['reruns']:>7} {level['errors']:>6} {level['p50_ms']:>9} {level['p95_ms']:>9} "
+              f"{level['reruns_per_s']:>9} {level['rss_after_mb']:>9}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', type=Path, required=True, help="directory holding the Deces_YYYY.csv files")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16], help="concurrent sessions, one run per value")
+    parser.add_argument('--interactions', type=int, default=20, help="sidebar changes per session")
+    parser.add_argument('--backend', choices=['memory', 'dataset'], default='memory')
+    parser.add_argument('--timeout', type=float, default=120, help="seconds a single rerun may take")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help="save the results as JSON")
+    args = parser.parse_args()
+
+    # Read by the cleaning below and by the servers, which inherit the environment
+    os.environ['DECES_DATA_DIR'] = str(args.data.resolve())
+    os.environ['DECES_BACKEND'] = args.backend
+    sys.path.insert(0, str(ROOT))
+    results = run(args.sessions, args.interactions, args.timeout, args.seed)
+    if args.output:
+        import pandas as pd
+        import streamlit
+        args.output.write_text(json.dumps({
+            'data': str(args.data),
+            'backend': args.backend,
+            'interactions': args.interactions,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'streamlit': streamlit.__version__,
+            'cpus': os.cpu_count(),
+            'results': results,
+        }, indent=2))
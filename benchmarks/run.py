@@ -0,0 +1,184 @@
+"""Time the data pipeline, the filters and the chart aggregations on a data directory.
+
+    python benchmarks/generate.py --rows 1000000 --out /tmp/deces
+    python benchmarks/run.py --data /tmp/deces --output results.json
+
+Each stage records its wall time, the peak of the memory allocated while it
+runs (tracemalloc: Python, NumPy and pandas buffers) and the maximum RSS of
+the process and of the cleaning workers so far. Nothing is rendered: the
+charts run against a stub of Streamlit, so only the aggregation and the
+Plotly figure serialization are timed. Everything runs offline on the CPU.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class StubStreamlit:
+    """Stands in for `streamlit` in utils.viz: every call is a no-op, except that
+    Plotly figures are serialized as st.plotly_chart would."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def columns(self, spec, **kwargs):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def plotly_chart(self, fig, **kwargs):
+        fig.to_json()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def max_rss_mb() -> float:
+    """Maximum RSS of this process and of its finished children, in MB (Linux reports KB)."""
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return usage / 1024 if sys.platform != 'darwin' else usage / 1024 ** 2
+
+
+def measure(results: list, stage: str, fn):
+    """Run fn() once, append its timings to results and return its result.
+
+    peak_mb is the most memory allocated on top of what was allocated before
+    the stage, or None when tracemalloc is off.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - start
+    peak = round((tracemalloc.get_traced_memory()[1] - before) / 1024 ** 2, 1) if tracing else None
+    results.append({'stage': stage, 'seconds': round(seconds, 4), 'peak_mb': peak, 'max_rss_mb': round(max_rss_mb(), 1)})
+    print(f"{stage:<40} {seconds:>9.3f} s {peak if tracing else '-':>9} MB")
+    return value
+
+
+def run(skip_cleaning=False) -> list:
+    # Imported here, once DECES_DATA_DIR points at the benchmark data
+    import streamlit.logger
+    import utils.viz as viz
+    from utils.backend import DatasetBackend
+    from utils.cache import Selection
+    from utils.cube import filter_cube, select_baseline, select_name_stats
+    from utils.filters import FilterEngine
+    from utils.geo import search_communes
+    from utils.io import (
+        DASHBOARD_COLUMNS, load_baseline, load_communes, load_cube, load_data, load_name_stats, load_table,
+        load_text_index,
+    )
+    from utils.prep import (
+        CLEANED_PATH, MANIFEST_PATH, SNAPSHOT_PATH, cleaning, dataset_period, dataset_version, load_manifest,
+    )
+
+    # Silence the "no script run context" warnings of the caches used without a server
+    streamlit.logger.set_log_level('error')
+    results = []
+
+    # Pipeline. The cleaning workers are forked, so tracing would slow them down: only
+    # their time and maximum RSS are recorded.
+    if not skip_cleaning:
+        # Without a manifest, every partition is rebuilt
+        MANIFEST_PATH.unlink(missing_ok=True)
+        measure(results, 'cleaning (full rebuild)', lambda: cleaning())
+    tracemalloc.start()
+    version = dataset_version(load_manifest())
+    period = dataset_period(load_manifest())
+    SNAPSHOT_PATH.unlink(missing_ok=True)
+    measure(results, 'load_table (snapshot build)', lambda: load_table(version))
+    load_table.clear()
+    measure(results, 'load_table (memory map)', lambda: load_table(version))
+    df = measure(results, 'load_data', lambda: load_data(version, DASHBOARD_COLUMNS))
+    cube = measure(results, 'load_cube', lambda: load_cube(version))
+    names = measure(results, 'load_name_stats', lambda: load_name_stats(version))
+    communes = measure(results, 'load_communes', lambda: load_communes(version))
+    baseline = measure(results, 'load_baseline', lambda: load_baseline(version))
+    measure(results, 'text index (prenom)', lambda: load_text_index(version, 'prenom'))
+
+    # Filters, each on a fresh engine so no bitmap is cached
+    places = measure(results, 'resolve place search', lambda: search_communes(communes, 'saint'))
+    filters = {
+        'eq (gender)': ('sexeCategorical', 'eq', 'Female'),
+        'between (age group)': ('age', 'between', (75, 89)),
+        'contains (first name)': ('prenom', 'contains', 'mar'),
+        'isin (place of birth)': ('commnaiss', 'isin', places),
+    }
+    for label, predicate in filters.items():
+        engine = FilterEngine(df, lambda column: load_text_index(version, column))
+        measure(results, f'filter {label}', lambda: engine.mask(*predicate))
+    engine = FilterEngine(df, lambda column: load_text_index(version, column))
+    measure(results, 'select (all filters)', lambda: engine.select(list(filters.values())))
+    measure(results, 'name stats (gender, age group)',
+            lambda: select_name_stats(names, [filters['eq (gender)'], filters['between (age group)']]))
+
+    # Chart aggregations, from the cube and from the rows (what a text search falls back to)
+    selections = {
+        'cube': Selection(('bench', 'cube'), rows=lambda: df, cube=lambda: filter_cube(cube, 'All', (0, 122)),
+                          name_stats=lambda: select_name_stats(names, []), baseline=lambda: select_baseline(baseline, [])),
+        'rows': Selection(('bench', 'rows'), rows=lambda: df),
+    }
+    for source, selection in selections.items():
+        for chart, aggregate in viz.AGGREGATES.items():
+            measure(results, f'aggregate {chart} ({source})', lambda: aggregate(selection))
+
+    # Figures from cached aggregates, so only building and serializing them is timed
+    viz.st = StubStreamlit()
+    selection = selections['cube']
+    plots = {
+        'kpis': viz.plot_kpis_by_gender,
+        'age distribution': viz.plot_age_distribution_by_gender,
+        'timeline': lambda s: viz.plot_mortality_over_time(s, period, max_points=1500),
+        'excess mortality': viz.plot_excess_mortality,
+        'generation': viz.plot_deaths_by_generation,
+        'first names': viz.plot_prenom_analysis,
+        'covid waves': viz.plot_covid_age_impact,
+        'department map': lambda s: viz.plot_deaths_by_department_map(s, period),
+    }
+    for label, plot in plots.items():
+        plot(selection)
+        measure(results, f'render {label}', lambda: plot(selection))
+
+    # Out-of-core backend
+    backend = DatasetBackend(CLEANED_PATH)
+    measure(results, 'backend scan (no filter)', lambda: backend.aggregate([]))
+    measure(results, 'backend scan (gender, age group)',
+            lambda: backend.aggregate([filters['eq (gender)'], filters['between (age group)']]))
+    tracemalloc.stop()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', type=Path, required=True, help="directory holding the Deces_YYYY.csv files")
+    parser.add_argument('--output', type=Path, help="save the results as JSON")
+    parser.add_argument('--skip-cleaning', action='store_true', help="reuse the partitions already cleaned")
+    args = parser.parse_args()
+
+    os.environ['DECES_DATA_DIR'] = str(args.data.resolve())
+    sys.path.insert(0, str(ROOT))
+    results = run(args.skip_cleaning)
+    if args.output:
+        import pandas as pd
+        import pyarrow as pa
+        args.output.write_text(json.dumps({
+            'data': str(args.data),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'pyarrow': pa.__version__,
+            'cpus': os.cpu_count(),
+            'results': results,
+        }, indent=2))
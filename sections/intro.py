@@ -1,13 +1,13 @@
 import streamlit as st
 import pandas as pd
 
-def display_intro(df: pd.DataFrame):
-    st.title("📊 Deaths in France Analysis (2020-2022, COVID Period)")
+def display_intro(df: pd.DataFrame, period: str):
+    st.title(f"📊 Deaths in France Analysis ({period}, COVID Period)")
     st.markdown("Alexandre MUNIER | alexandre.munier@efrei.net | [GitHub](https://github.com/AlexM872)")
     st.caption("Source : Fichier des personnes décédées (INSEE via data.gouv.fr)")
     st.markdown("EFREI Data Visualization Project - October 2025")
-    st.header("🔍 Impact of COVID-19 on mortality in France (2020-2022)")
-    st.header("How I Cleaned the Data: Focusing on the COVID Period (2020-2022)")
+    st.header(f"🔍 Impact of COVID-19 on mortality in France ({period})")
+    st.header(f"How I Cleaned the Data: Focusing on the COVID Period ({period})")
     st.markdown("""
 Before diving into the analysis, let's take a look at how I transformed raw, messy records into a reliable dataset.  
 
@@ -32,7 +32,7 @@ Before diving into the analysis, let's take a look at how I transformed raw, mes
    Gender codes (`1` for male, `2` for female) were mapped to readable labels, making charts and stats more intuitive.
 
 7. **Year Filtering**  
-   Only deaths from 2020 to 2022 were kept, focusing the analysis on the COVID period.
+   Only deaths from 2020 on were kept, focusing the analysis on the COVID period.
 
 8. **Saving Clean Data**  
    The final, polished dataset was saved in both CSV and Parquet formats for fast, flexible access.
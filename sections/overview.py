@@ -1,14 +1,16 @@
 # sections/overview.py
 import streamlit as st
-import pandas as pd
 from utils.viz import plot_kpis_by_gender, plot_mortality_over_time
 
-def display_overview(df: pd.DataFrame):
-    st.header("Overview of Mortality in France (2020-2022, COVID Period)")
+# Daily points drawn on the timeline before it is downsampled
+TIMELINE_MAX_POINTS = 1500
+
+def display_overview(selection, period):
+    st.header(f"Overview of Mortality in France ({period}, COVID Period)")
     
     # KPIs en premier
-    plot_kpis_by_gender(df)
+    plot_kpis_by_gender(selection)
     st.markdown("---")
     
-    plot_mortality_over_time(df)
-    st.info("This dashboard analyzes mortality in France during the COVID-19 period (2020-2022). You can observe the impact of pandemic waves and seasonal effects on death counts.\nEspecially in winter, probably also due to flu season.")
\ No newline at end of file
+    plot_mortality_over_time(selection, period, max_points=TIMELINE_MAX_POINTS)
+    st.info(f"This dashboard analyzes mortality in France during the COVID-19 period ({period}). You can observe the impact of pandemic waves and seasonal effects on death counts.\nEspecially in winter, probably also due to flu season.")
\ No newline at end of file
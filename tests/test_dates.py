@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from utils.prep import exact_age, parse_yyyymmdd
+
+
+def test_parse_valid_dates():
+    dates, valid = parse_yyyymmdd(pd.Series([20200315, 19991231, 20240229, 20000229]))
+    assert valid.all()
+    assert dates.tolist() == pd.to_datetime(['2020-03-15', '1999-12-31', '2024-02-29', '2000-02-29']).tolist()
+
+
+def test_placeholders_and_impossible_dates_are_invalid():
+    # INSEE writes unknown months and days as 00; Feb 29 only exists in leap years (not 1900 nor 2023)
+    values = pd.Series([19500000, 19500700, 19500015, 20230229, 19000229, 20201301, 20200431, 0])
+    dates, valid = parse_yyyymmdd(values)
+    assert not valid.any()
+    assert np.isnat(dates).all()
+
+
+def test_parse_reads_strings_and_missing_values():
+    dates, valid = parse_yyyymmdd(pd.Series(['20210101', None, 'abc']))
+    assert valid.tolist() == [True, False, False]
+    assert dates[0] == np.datetime64('2021-01-01')
+
+
+def test_exact_age_counts_completed_years():
+    births = pd.Series([19500615, 19500615, 19500615, 20200101])
+    deaths = pd.Series([20200614, 20200615, 20200616, 20200101])
+    # The day before the birthday, on it, after it, and a death on the day of birth
+    assert exact_age(births, deaths).tolist() == [69, 70, 70, 0]
+
+
+def test_exact_age_of_a_february_29_birthday():
+    births = pd.Series([19400229, 19400229, 19400229])
+    deaths = pd.Series([20210228, 20210301, 20200229])
+    # In a common year the birthday is only reached on March 1st
+    assert exact_age(births, deaths).tolist() == [80, 81, 80]
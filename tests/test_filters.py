@@ -0,0 +1,49 @@
+from itertools import product
+import pandas as pd
+from utils.cache import filter_signature
+from utils.filters import FilterEngine, filter_predicates, normalize_search
+from utils.search import TextIndex
+
+
+def make_engine():
+    df = pd.DataFrame({
+        'prenom': ['MARIE', 'ANNE MARIE', 'MARIELLE', 'JEAN', 'JEAN MARIE'],
+        'sexeCategorical': ['Female', 'Female', 'Female', 'Male', 'Male'],
+        'age': [80, 65, 40, 90, 70],
+    })
+    return FilterEngine(df, lambda column: TextIndex(df[column]))
+
+
+def test_normalize_search_strips_whitespace():
+    assert normalize_search('  Marie \t') == 'Marie'
+    assert normalize_search('Jean Marie') == 'Jean Marie'
+
+
+def test_same_signature_gives_same_predicates():
+    engine = make_engine()
+    texts = ['', 'MARIE', 'MARIE ', ' marie', 'Marie', 'marie  ', 'jean marie', 'JEAN MARIE ']
+    by_signature = {}
+    for gender, text, exclusive in product(['All', 'Female'], texts, [False, True]):
+        prenom = normalize_search(text)
+        signature = filter_signature(gender, 'All', prenom, '', exclusive)
+        predicates = filter_predicates(gender, None, prenom, exclusive)
+        rows = engine.select(predicates).index.tolist()
+        expected = by_signature.setdefault(signature, (predicates, rows))
+        assert (predicates, rows) == expected, (gender, text, exclusive)
+
+
+def test_trailing_space_does_not_change_the_selection():
+    engine = make_engine()
+    for exclusive in [False, True]:
+        selected = [
+            engine.select(filter_predicates('All', None, normalize_search(text), exclusive)).index.tolist()
+            for text in ['MARIE', 'MARIE ']
+        ]
+        assert selected[0] == selected[1]
+    assert engine.select(filter_predicates('All', None, 'MARIE', True)).index.tolist() == [0]
+
+
+def test_exclusive_and_substring_searches_have_different_signatures():
+    assert filter_signature('All', 'All', 'MARIE', '', False) != filter_signature('All', 'All', 'MARIE', '', True)
+    # Without a first name the exclusive checkbox selects nothing different
+    assert filter_signature('All', 'All', '', '', False) == filter_signature('All', 'All', '', '', True)
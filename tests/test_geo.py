@@ -0,0 +1,18 @@
+import pandas as pd
+from utils.geo import commune_lookup, search_communes
+
+
+def test_search_resolves_names_sharing_a_code():
+    counts = pd.DataFrame({
+        # Births abroad share their country's code, merged communes share the new commune's code
+        'lieunaiss': ['99350', '99350', '49092', '49092', '75056'],
+        'commnaiss': ['CASABLANCA', 'RABAT', 'CHEMILLE-EN-ANJOU', 'CHEMILLE-MELAY', 'PARIS'],
+        'deaths': [5, 9, 7, 2, 30],
+    })
+    lookup = commune_lookup(pd.concat([counts, counts.head(1)]))
+    assert len(lookup) == 5
+    assert lookup.loc[lookup['commnaiss'] == 'CASABLANCA', 'deaths'].item() == 10
+    assert search_communes(lookup, 'casa') == ('CASABLANCA',)
+    assert search_communes(lookup, 'Chemill') == ('CHEMILLE-EN-ANJOU', 'CHEMILLE-MELAY')
+    assert search_communes(lookup, 'melay') == ('CHEMILLE-MELAY',)
+    assert search_communes(lookup, 'lyon') == ()
@@ -0,0 +1,135 @@
+from itertools import product
+import numpy as np
+import pandas as pd
+import pytest
+from utils.backend import DatasetBackend
+from utils.cube import (
+    build_baseline, build_cube, build_name_stats, count_by, filter_cube, merge_baseline, merge_cube,
+    merge_name_stats, select_baseline, select_name_stats,
+)
+from utils.filters import age_group_options, filter_predicates
+from utils.prep import MAX_AGE, write_parquet
+
+NAMES = ['MARIE', 'ANNE MARIE', 'MARIELLE', 'JEAN', 'JEAN MARIE', 'PIERRE']
+GENDERS = ['All', 'Female', 'Male']
+AGE_RANGES = list(age_group_options(0, MAX_AGE).values())
+# First-name searches as typed, each with and without the exclusive checkbox
+SEARCHES = [('', False), ('marie', False), ('Marie', True), ('jean', False)]
+# Every breakdown the charts read from the cube
+CUBE_QUERIES = [['datedeces'], ['dept_deces', 'sexeCategorical'], ['generation', 'sexeCategorical'], ['age']]
+
+
+def make_rows(years, n=3000, seed=0):
+    """Cleaned rows of deaths in `years`, as the partitions hold them."""
+    rng = np.random.default_rng(seed)
+    datedeces = pd.to_datetime({
+        'year': rng.choice(years, n), 'month': rng.integers(1, 13, n), 'day': rng.integers(1, 29, n),
+    })
+    age = rng.integers(0, 110, n)
+    rows = pd.DataFrame({
+        'datedeces': datedeces,
+        'annee_deces': datedeces.dt.year.astype('int16'),
+        'mois_deces': (datedeces.dt.year * 100 + datedeces.dt.month).astype('int32'),
+        'annee_naiss': (datedeces.dt.year - age).astype('int16'),
+        'age': age.astype('int8'),
+        'sexeCategorical': pd.Categorical(rng.choice(['Male', 'Female'], n), categories=['Male', 'Female']),
+        'prenom': pd.Categorical(rng.choice(NAMES, n)),
+        'commnaiss': pd.Categorical(rng.choice(['PARIS', 'LYON', 'AJACCIO'], n)),
+        'dept_deces': pd.Categorical(rng.choice(['2A', '69', '75', '971'], n)),
+    })
+    return rows.sort_values('datedeces', ignore_index=True)
+
+
+def matching(rows, predicates):
+    """Reference selection: the rows matching every predicate, with plain pandas."""
+    mask = np.ones(len(rows), dtype=bool)
+    for column, op, value in predicates:
+        values = rows[column]
+        if op == 'eq':
+            mask &= (values == value).to_numpy()
+        elif op == 'between':
+            mask &= values.between(*value).to_numpy()
+        elif op == 'isin':
+            mask &= values.isin(value).to_numpy()
+        else:
+            mask &= values.astype(str).str.casefold().str.contains(value.casefold(), regex=False).to_numpy()
+    return rows[mask]
+
+
+def counts(series: pd.Series) -> dict:
+    return {key: value for key, value in series.items() if value}
+
+
+def halves(rows, build, merge):
+    """Aggregate the rows as two partitions, merged like the loaders do."""
+    middle = len(rows) // 2
+    return merge([build(rows.iloc[:middle]), build(rows.iloc[middle:])])
+
+
+def test_cube_counts_match_the_rows():
+    rows = make_rows([2020, 2021, 2022])
+    cube = halves(rows, build_cube, lambda parts: merge_cube({name: pd.concat([part[name] for part in parts])
+                                                                for name in parts[0]}))
+    for gender, age_range in product(GENDERS, AGE_RANGES):
+        selected = matching(rows, filter_predicates(gender, age_range))
+        filtered = filter_cube(cube, gender, age_range)
+        for keys in CUBE_QUERIES:
+            expected = counts(count_by(selected, None, keys))
+            assert counts(count_by(None, filtered, keys)) == expected, (gender, age_range, keys)
+
+
+def test_name_stats_match_the_rows():
+    rows = make_rows([2020, 2021, 2022])
+    stats = halves(rows, build_name_stats, merge_name_stats)
+    for gender, age_range, (text, exclusive) in product(GENDERS, [None] + AGE_RANGES, SEARCHES):
+        predicates = filter_predicates(gender, age_range, text, exclusive)
+        selected = matching(rows, predicates).groupby('prenom', observed=True)['age']
+        names = select_name_stats(stats, predicates)
+        # The sidebar's age groups end on age band boundaries: the table always answers them
+        assert names is not None, predicates
+        assert counts(names['deaths']) == counts(selected.size()), predicates
+        assert counts(names['age_sum']) == counts(selected.sum().astype('int64')), predicates
+
+
+def test_name_stats_refuse_an_age_range_within_a_band():
+    rows = make_rows([2020])
+    stats = build_name_stats(rows)
+    # The 60-74 band holds ages above 70, which the table cannot tell apart
+    assert select_name_stats(stats, [('age', 'between', (60, 70))]) is None
+    # Without older ages in the band, the same range is answered exactly
+    young = rows[rows['age'] <= 70]
+    names = select_name_stats(build_name_stats(young), [('age', 'between', (60, 70))])
+    assert counts(names['deaths']) == counts(young[young['age'] >= 60].groupby('prenom', observed=True).size())
+    # Other columns are never answered from the table
+    assert select_name_stats(stats, [('commnaiss', 'isin', ('PARIS',))]) is None
+
+
+def test_baseline_matches_the_rows():
+    years = [2015, 2016, 2017, 2018, 2019]
+    rows = make_rows(years)
+    baseline = halves(rows, build_baseline, merge_baseline)
+    for gender, age_range in product(GENDERS, [None] + AGE_RANGES):
+        predicates = filter_predicates(gender, age_range)
+        expected = matching(rows, predicates).groupby(rows['datedeces'].dt.month).size() / len(years)
+        monthly = select_baseline(baseline, predicates)
+        assert monthly.to_dict() == expected.reindex(range(1, 13), fill_value=0).to_dict(), predicates
+    assert select_baseline(baseline, filter_predicates('All', None, 'marie')) is None
+    assert select_baseline(baseline, [('age', 'between', (60, 70))]) is None
+
+
+@pytest.mark.parametrize('communes', [None, ('PARIS', 'AJACCIO')])
+def test_dataset_backend_matches_the_rows(tmp_path, communes):
+    rows = make_rows([2020, 2021, 2022])
+    for year, partition in rows.groupby('annee_deces'):
+        write_parquet(partition, tmp_path / f'Deces_{year}.parquet')
+    backend = DatasetBackend(tmp_path)
+    # The age groups are pushed down as the same expression: the open-ended one stands for the others
+    for gender, age_range, (text, exclusive) in product(GENDERS, [None, (90, MAX_AGE)], SEARCHES):
+        predicates = filter_predicates(gender, age_range, text, exclusive, communes)
+        selected = matching(rows, predicates)
+        cube, names = backend.aggregate(predicates)
+        for keys in CUBE_QUERIES:
+            assert counts(count_by(None, cube, keys)) == counts(count_by(selected, None, keys)), (predicates, keys)
+        by_name = selected.groupby('prenom', observed=True)['age']
+        assert counts(names['deaths']) == counts(by_name.size()), predicates
+        assert counts(names['age_sum']) == counts(by_name.sum().astype('int64')), predicates
@@ -0,0 +1,123 @@
+import importlib
+import json
+from collections import Counter
+import pandas as pd
+import pytest
+import utils.prep
+
+HEADER = 'nomprenom;sexe;datenaiss;lieunaiss;commnaiss;paysnaiss;datedeces;lieudeces;actedeces'
+
+
+@pytest.fixture
+def prep(tmp_path, monkeypatch):
+    """utils.prep with its whole pipeline pointed at an empty data directory."""
+    monkeypatch.setenv('DECES_DATA_DIR', str(tmp_path))
+    yield importlib.reload(utils.prep)
+    monkeypatch.undo()
+    importlib.reload(utils.prep)
+
+
+def records(year, months, per_month=5):
+    """Distinct death records of `year`, `per_month` deaths in each of `months`."""
+    return [
+        f'NOM{month}X{i}*PRENOM{i}/;{1 + i % 2};19500{month % 9 + 1}1{i};75056;PARIS;;{year}{month:02d}1{i};'
+        f'13055;{month}{i}'
+        for month in months for i in range(per_month)
+    ]
+
+
+def write_source(prep, name, lines):
+    (prep.DATA_PATH / name).write_text('\n'.join([HEADER] + lines) + '\n')
+
+
+@pytest.mark.parametrize('append', [False, True])
+def test_yearly_file_after_its_drops_supersedes_them(prep, append):
+    write_source(prep, 'Deces_2020.csv', records(2020, range(1, 13)))
+    write_source(prep, 'Deces_2023_M01.csv', records(2023, [1]))
+    prep.cleaning(max_workers=1, append=append)
+    # The yearly file of 2023 is published after its January drop, and holds it
+    write_source(prep, 'Deces_2023.csv', records(2023, range(1, 13)))
+    prep.cleaning(max_workers=1, append=append)
+
+    rows = pd.read_parquet(prep.CLEANED_PATH)
+    assert len(rows) == 24 * 5
+    assert not rows.duplicated(['nom', 'prenom', 'datenaiss', 'datedeces']).any()
+    manifest = prep.load_manifest()
+    assert sum(entry['rows'] for entry in manifest['files'].values()) == 24 * 5
+    assert manifest['files']['Deces_2023_M01.csv']['rows'] == 0
+    # Nothing left to repair on the next run
+    prep.cleaning(max_workers=1)
+    assert prep.load_manifest() == manifest
+
+
+def test_append_deduplicates_a_drop_against_the_files_before_it(prep):
+    write_source(prep, 'Deces_2020.csv', records(2020, range(1, 13)))
+    prep.cleaning(max_workers=1, append=True)
+    # A drop repeating two records of the yearly file, and one of its own
+    write_source(prep, 'Deces_2021_M01.csv', records(2020, [3], per_month=2) + records(2021, [1]) + records(2021, [1])[:1])
+    prep.cleaning(max_workers=1, append=True)
+
+    manifest = prep.load_manifest()
+    assert manifest['files']['Deces_2021_M01.csv']['rows'] == 5
+    rows = pd.read_parquet(prep.CLEANED_PATH)
+    assert len(rows) == 65
+    assert not rows.duplicated(['nom', 'prenom', 'datenaiss', 'datedeces']).any()
+
+
+@pytest.mark.parametrize('append', [False, True])
+def test_yearly_file_is_deduplicated_against_the_years_before_it(prep, append):
+    write_source(prep, 'Deces_2020.csv', records(2020, range(1, 13)))
+    # Two deaths of December 2020 registered late, published again in the 2021 file
+    write_source(prep, 'Deces_2021.csv', records(2020, [12], per_month=2) + records(2021, range(1, 13)))
+    prep.cleaning(max_workers=2, append=append)
+
+    rows = pd.read_parquet(prep.CLEANED_PATH)
+    assert len(rows) == 24 * 5
+    assert not rows.duplicated(['nom', 'prenom', 'datenaiss', 'datedeces']).any()
+    manifest = prep.load_manifest()
+    assert manifest['files']['Deces_2021.csv']['rows'] == 12 * 5
+    prep.cleaning(max_workers=1)
+    assert prep.load_manifest() == manifest
+
+
+def test_late_registrations_of_the_baseline_years_are_counted(prep):
+    write_source(prep, 'Deces_2019.csv', records(2019, range(1, 13)))
+    # Deaths of December 2019 registered in 2020
+    write_source(prep, 'Deces_2020.csv', [r.replace('NOM', 'LATE') for r in records(2019, [12], per_month=2)] + records(2020, range(1, 13)))
+    prep.cleaning(max_workers=2)
+
+    assert len(pd.read_parquet(prep.CLEANED_PATH)) == 12 * 5
+    baseline = pd.read_parquet(prep.BASELINE_PATH)
+    assert baseline['deaths'].sum() == 12 * 5 + 2
+    assert baseline.loc[baseline['annee_deces'] == 2019, 'deaths'].sum() == 12 * 5 + 2
+
+
+def test_a_failed_build_is_retried_once_the_sources_change(prep):
+    write_source(prep, 'Deces_2020.csv', records(2020, range(1, 13)))
+    prep.CLEANED_PATH.mkdir()
+    prep.BUILD_ERROR_PATH.write_text(json.dumps({'sources': prep.source_signature(), 'error': 'Traceback'}))
+    assert prep.build_error() == 'Traceback'
+    write_source(prep, 'Deces_2021.csv', records(2021, range(1, 13)))
+    assert prep.build_error() is None
+
+
+def test_codes_are_read_as_strings_whatever_the_chunk(tmp_path):
+    lines = ['A*B/;1;19500101;07004;AUBENAS;;20210301;63012;12', 'C*D/;2;19400202;63012;CLERMONT;;20210402;;7']
+    plain, corsican = tmp_path / 'Deces_2021.csv', tmp_path / 'Deces_2022.csv'
+    plain.write_text('\n'.join([HEADER] + lines) + '\n')
+    corsican.write_text('\n'.join([HEADER] + lines + ['E*F/;1;19300303;2A004;AJACCIO;;20210503;2A004;3']) + '\n')
+
+    [(chunk, keys)] = utils.prep.clean_chunks(plain, Counter())
+    [(_, corsican_keys)] = utils.prep.clean_chunks(corsican, Counter())
+    assert chunk['lieunaiss'].tolist() == ['07004']
+    assert chunk['dept_naiss'].tolist() == ['07']
+    assert chunk['dept_deces'].tolist() == ['63']
+    # Missing values do not turn the other codes into floats, nor change the hashes
+    assert keys.tolist() == corsican_keys[:2].tolist()
+
+
+def test_dataset_period_follows_the_ingested_files():
+    files = {'Deces_2020.csv': {}, 'Deces_2021.csv': {}, 'Deces_2022.csv': {}}
+    assert utils.prep.dataset_period({'files': files}) == '2020-2022'
+    assert utils.prep.dataset_period({'files': {**files, 'Deces_2023_M01.csv': {}}}) == '2020-2023'
+    assert utils.prep.dataset_period({'files': {'Deces_2020.csv': {}}}) == '2020'
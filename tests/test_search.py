@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from utils.search import TextIndex
+
+NAMES = pd.Series(['MARIE', 'JEAN', 'ANNE MARIE', None, 'JEAN', 'MARC', 'MARIE', 'LÉA', 'JO'])
+
+
+def matches(index, query):
+    return sorted(index.values[index.search(query)])
+
+
+def test_search_ignores_case_and_confirms_substrings():
+    index = TextIndex(NAMES)
+    # 'MARC' shares the trigram 'MAR' with the query, but does not contain it
+    assert matches(index, 'marie') == ['ANNE MARIE', 'MARIE']
+    assert matches(index, 'mar') == ['ANNE MARIE', 'MARC', 'MARIE']
+    assert matches(index, 'léa') == ['LÉA']
+    assert matches(index, 'zzz') == []
+
+
+def test_short_queries_scan_every_value():
+    index = TextIndex(NAMES)
+    assert matches(index, 'jo') == ['JO']
+    assert matches(index, 'a') == ['ANNE MARIE', 'JEAN', 'LÉA', 'MARC', 'MARIE']
+    assert len(index.search('')) == len(index.values)
+
+
+def test_rows_returns_the_sorted_positions_of_the_values():
+    index = TextIndex(NAMES)
+    rows = index.rows(index.search('marie'))
+    assert rows.tolist() == [0, 2, 6]
+    assert rows.tolist() == np.flatnonzero(NAMES.str.contains('MARIE', na=False)).tolist()
+    assert index.rows(index.search('zzz')).tolist() == []
@@ -0,0 +1,57 @@
+from itertools import chain
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from utils.cube import build_cube, merge_cube
+
+# Columns the scan needs to build the cube and the first-name statistics
+SCAN_COLUMNS = ['datedeces', 'sexeCategorical', 'age', 'annee_naiss', 'dept_deces', 'prenom']
+
+
+def filter_expression(predicates: list):
+    """Arrow expression equivalent to FilterEngine predicates, pushed down to the scan."""
+    expression = None
+    for column, op, value in predicates:
+        field = pc.field(column)
+        if op == 'eq':
+            condition = field == value
+        elif op == 'between':
+            condition = (field >= value[0]) & (field <= value[1])
+        elif op == 'isin':
+            condition = field.cast(pa.string()).isin(pa.array(value, type=pa.string()))
+        elif op == 'contains':
+            condition = pc.match_substring(field.cast(pa.string()), value, ignore_case=True)
+        else:
+            raise ValueError(f"Unknown filter operation: {op}")
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+class DatasetBackend:
+    """Out-of-core queries over the Parquet partitions.
+
+    The sidebar filters are pushed down to a pyarrow.dataset scan, which is
+    aggregated batch by batch: only the cube and per-name statistics of the
+    selected rows are ever held in memory, never the rows themselves.
+    """
+
+    def __init__(self, path):
+        self.dataset = ds.dataset(path, format='parquet')
+
+    def head(self, columns, n=5) -> pd.DataFrame:
+        return self.dataset.head(n, columns=list(columns)).to_pandas()
+
+    def aggregate(self, predicates: list):
+        """Cube and per-name statistics (deaths, age_sum) of the rows matching the predicates."""
+        scanner = self.dataset.scanner(columns=SCAN_COLUMNS, filter=filter_expression(predicates))
+        # Start from an empty batch so an empty selection still gives well-formed results
+        empty = self.dataset.schema.empty_table().select(SCAN_COLUMNS)
+        cube_parts, name_parts = [], []
+        for batch in chain([empty], scanner.to_batches()):
+            rows = batch.to_pandas()
+            cube_parts.append(build_cube(rows))
+            name_parts.append(rows.groupby('prenom', observed=True)['age'].agg(deaths='size', age_sum='sum'))
+        cube = merge_cube({name: pd.concat([part[name] for part in cube_parts]) for name in cube_parts[0]})
+        name_stats = pd.concat(name_parts).groupby(level=0).sum()
+        return cube, name_stats
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from functools import cached_property
+import threading
+
+
+def filter_signature(gender: str, age_group: str, prenom: str, commune: str, exclusive: bool) -> tuple:
+    """Canonical form of the sidebar filters: equivalent selections give the same signature.
+
+    The search texts are the normalized ones (utils.filters.normalize_search)
+    the predicates are built from; the signature only folds what the predicates
+    ignore too, so two filters with the same signature select the same rows.
+    """
+    return (
+        gender,
+        age_group,
+        # Substring searches ignore case; the exclusive filter compares upper-cased names
+        prenom.upper() if exclusive else prenom.casefold(),
+        commune.casefold(),
+        bool(prenom) and exclusive,
+    )
+
+
+class AggregateCache:
+    """Chart aggregates shared by every session, keyed by (chart, filter signature, dataset version).
+
+    The cache holds at most `max_entries` aggregates and evicts the least
+    recently used one first, so its memory stays capped however many filter
+    combinations the users try.
+    """
+
+    def __init__(self, max_entries=512):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, entries: dict):
+        """Add precomputed aggregates, e.g. the ones saved by utils.prewarm."""
+        with self._lock:
+            self._entries.update(entries)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key, compute):
+        """Cached value of `key`, computed with compute() on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # Computed outside the lock so that slow charts do not block the other sessions
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+class Selection:
+    """The data behind the charts for one filter combination, computed on first use.
+
+    `key` is the filter signature plus the dataset version. `rows`, `cube`,
+    `name_stats` and `baseline` are zero-argument callables; a chart whose
+    aggregate is already cached never calls them, so a fully cached rerun
+    touches no rows at all.
+    """
+
+    def __init__(self, key, rows, cube=lambda: None, name_stats=lambda: None, baseline=lambda: None):
+        self.key = key
+        self._rows = rows
+        self._cube = cube
+        self._name_stats = name_stats
+        self._baseline = baseline
+
+    @cached_property
+    def df(self):
+        return self._rows()
+
+    @cached_property
+    def cube(self):
+        return self._cube()
+
+    @cached_property
+    def name_stats(self):
+        return self._name_stats()
+
+    @cached_property
+    def baseline(self):
+        return self._baseline()
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+from utils.geo import department_codes
+
+# Count rollups written by cleaning(), each keyed by sex and age plus one chart dimension.
+# The full date x department x birth decade product has about one cell per death,
+# so the cube is materialized as the rollups the charts actually group by.
+CUBE_ROLLUPS = {
+    'date': 'datedeces',
+    'dept': 'dept_deces',
+    'generation': 'generation',
+}
+CUBE_KEYS = ['sexeCategorical', 'age']
+
+
+def key_column(df: pd.DataFrame, key: str) -> pd.Series:
+    """Column `key` of the rows, deriving the cube dimensions that are not stored."""
+    if key in df.columns:
+        return df[key]
+    if key == 'generation':
+        return ((df['annee_naiss'] // 10) * 10).rename(key)
+    if key == 'dept_deces':
+        return department_codes(df['lieudeces']).rename(key)
+    raise KeyError(key)
+
+
+def build_cube(df: pd.DataFrame) -> dict:
+    """Count the deaths of every rollup cell."""
+    cube = {}
+    for name, dim in CUBE_ROLLUPS.items():
+        keys = [key_column(df, dim)] + [df[key] for key in CUBE_KEYS]
+        counts = df.groupby(keys, observed=True).size().astype('int32')
+        cube[name] = counts.rename('deaths').reset_index()
+    return cube
+
+
+def merge_cube(parts: dict) -> dict:
+    """Sum the rollups of several partitions (the same cell can appear in two source files)."""
+    return {
+        name: rollup.groupby([CUBE_ROLLUPS[name]] + CUBE_KEYS, observed=True)['deaths'].sum().reset_index()
+        for name, rollup in parts.items()
+    }
+
+
+def filter_cube(cube: dict, gender: str, age_range: tuple) -> dict:
+    """Restrict every rollup to one gender ('All' keeps both) and an age range."""
+    filtered = {}
+    for name, rollup in cube.items():
+        mask = rollup['age'].between(*age_range)
+        if gender != 'All':
+            mask &= rollup['sexeCategorical'] == gender
+        filtered[name] = rollup[mask]
+    return filtered
+
+
+def count_by(df: pd.DataFrame, cube: dict, keys: list) -> pd.Series:
+    """Number of deaths grouped by `keys`, read from the cube when one is given."""
+    if cube is not None:
+        dims = set(keys) - set(CUBE_KEYS)
+        # The smallest rollup holding every key answers the query
+        for rollup in sorted(cube.values(), key=len):
+            if dims <= set(rollup.columns):
+                return rollup.groupby(keys, observed=True)['deaths'].sum()
+        raise KeyError(f"No cube rollup is keyed by {sorted(dims)}")
+    return df.groupby([key_column(df, key) for key in keys], observed=True).size()
+
+
+# Per-first-name statistics, written by cleaning() next to the cube. Ages are kept as the
+# sidebar's age groups (lower bounds), so the gender, age group and first-name filters
+# apply to the table directly.
+NAME_KEYS = ['prenom', 'sexeCategorical', 'annee_deces', 'age_band']
+AGE_BANDS = [0, 20, 40, 60, 75, 90]
+# The first-name charts only show names with at least this many deaths
+POPULAR_NAME_MIN_DEATHS = 500
+
+
+def age_bands(age: pd.Series) -> pd.Series:
+    """Lower bound of the age band of every age."""
+    return pd.Series(np.asarray(AGE_BANDS, dtype='int8')[np.searchsorted(AGE_BANDS, age, side='right') - 1],
+                     index=age.index, name='age_band')
+
+
+def build_name_stats(df: pd.DataFrame) -> pd.DataFrame:
+    """Deaths, sum and sum of squares of the ages (and oldest age) per first name, sex, year and age band."""
+    age = df['age'].astype('int64')
+    bands = age_bands(age)
+    stats = pd.DataFrame({'age': age, 'age_sq': age * age})
+    stats = stats.groupby([df['prenom'], df['sexeCategorical'], df['annee_deces'], bands], observed=True).agg(
+        deaths=('age', 'size'), age_sum=('age', 'sum'), age_sumsq=('age_sq', 'sum'), age_max=('age', 'max'))
+    return stats.astype({'deaths': 'int32', 'age_max': 'int8'}).reset_index()
+
+
+def merge_name_stats(parts) -> pd.DataFrame:
+    """Sum the name statistics of several partitions."""
+    return pd.concat(parts).groupby(NAME_KEYS, observed=True).agg(
+        {'deaths': 'sum', 'age_sum': 'sum', 'age_sumsq': 'sum', 'age_max': 'max'}).reset_index()
+
+
+def heavy_hitters(stats: pd.DataFrame, min_deaths=POPULAR_NAME_MIN_DEATHS) -> pd.DataFrame:
+    """Rows of the names with at least min_deaths deaths overall.
+
+    Filters only lower the counts, so the popular names of any selection are
+    among these: the first-name charts never need the other rows.
+    """
+    totals = stats.groupby('prenom', observed=True)['deaths'].transform('sum')
+    stats = stats[totals >= min_deaths]
+    stats['prenom'] = stats['prenom'].cat.remove_unused_categories()
+    return stats.reset_index(drop=True)
+
+
+def select_name_stats(stats: pd.DataFrame, predicates: list):
+    """Deaths and age sum per first name of the rows matching the predicates.
+
+    Returns None when a predicate cannot be answered from the table (another
+    column, or an age range that does not end on an age band boundary).
+    """
+    mask = np.ones(len(stats), dtype=bool)
+    for column, op, value in predicates:
+        if column == 'sexeCategorical' and op == 'eq':
+            mask &= (stats['sexeCategorical'] == value).to_numpy()
+        elif column == 'prenom' and op == 'eq':
+            mask &= (stats['prenom'] == value).to_numpy()
+        elif column == 'prenom' and op == 'contains':
+            # Test the distinct names only, then map back to the rows
+            names = stats['prenom'].cat.categories
+            matches = names.str.casefold().str.contains(value.casefold(), regex=False)
+            mask &= matches[stats['prenom'].cat.codes.to_numpy()]
+        elif column == 'age' and op == 'between' and value[0] in AGE_BANDS:
+            bands = stats['age_band'].between(*value).to_numpy()
+            # Exact only if no selected band holds ages above the range
+            if (stats['age_max'].to_numpy()[bands] > value[1]).any():
+                return None
+            mask &= bands
+        else:
+            return None
+    return stats[mask].groupby('prenom', observed=True)[['deaths', 'age_sum']].sum()
+
+
+# Deaths of the years before the dashboard's period, the baseline of the excess mortality chart.
+# Kept per year so the average covers whichever baseline years were ingested.
+BASELINE_KEYS = ['annee_deces', 'mois', 'sexeCategorical', 'age_band', 'dept_deces']
+
+
+def build_baseline(df: pd.DataFrame) -> pd.DataFrame:
+    """Deaths (and oldest age) per year and calendar month of death, sex, age band and department."""
+    age = df['age'].astype('int64')
+    keys = [df['annee_deces'], (df['mois_deces'] % 100).rename('mois'), df['sexeCategorical'],
+            age_bands(age), key_column(df, 'dept_deces')]
+    baseline = age.groupby(keys, observed=True).agg(deaths='size', age_max='max')
+    return baseline.astype({'deaths': 'int32', 'age_max': 'int8'}).reset_index()
+
+
+def merge_baseline(parts) -> pd.DataFrame:
+    """Sum the baselines of several source files."""
+    return pd.concat(parts).groupby(BASELINE_KEYS, observed=True).agg(
+        {'deaths': 'sum', 'age_max': 'max'}).reset_index()
+
+
+def select_baseline(baseline: pd.DataFrame, predicates: list):
+    """Average deaths per calendar month (1 to 12) over the baseline years, for the predicates.
+
+    Returns None when there is no baseline, or when a predicate cannot be
+    answered from it (a text search, or an age range that does not end on an
+    age band boundary).
+    """
+    if baseline.empty:
+        return None
+    mask = np.ones(len(baseline), dtype=bool)
+    for column, op, value in predicates:
+        if column == 'sexeCategorical' and op == 'eq':
+            mask &= (baseline['sexeCategorical'] == value).to_numpy()
+        elif column == 'age' and op == 'between' and value[0] in AGE_BANDS:
+            bands = baseline['age_band'].between(*value).to_numpy()
+            if (baseline['age_max'].to_numpy()[bands] > value[1]).any():
+                return None
+            mask &= bands
+        else:
+            return None
+    years = baseline['annee_deces'].nunique()
+    monthly = baseline[mask].groupby('mois')['deaths'].sum().reindex(range(1, 13), fill_value=0)
+    return (monthly / years).rename('baseline')
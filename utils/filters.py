@@ -0,0 +1,107 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+import pandas as pd
+from utils.prep import MAX_AGE
+
+
+class FilterEngine:
+    """Row filters over one DataFrame, cached as one bitmap per (column, predicate).
+
+    Predicates are `(column, op, value)` tuples with op in 'eq', 'between',
+    'isin' (value is a tuple) or 'contains'. Each bitmap is computed once, shared by every session, and
+    combined with the others with a bitwise AND, so changing one widget only
+    computes that widget's bitmap and the rows are materialized once.
+    """
+
+    def __init__(self, df: pd.DataFrame, text_index, max_masks=64):
+        self.df = df
+        self._text_index = text_index
+        self._max_masks = max_masks
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mask(self, column: str, op: str, value) -> np.ndarray:
+        """Packed bitmap (np.packbits) of the rows matching one predicate."""
+        key = (column, op, value)
+        with self._lock:
+            if key in self._masks:
+                self._masks.move_to_end(key)
+                return self._masks[key]
+        bitmap = np.packbits(self._evaluate(column, op, value))
+        bitmap.flags.writeable = False
+        with self._lock:
+            self._masks[key] = bitmap
+            # Least recently used bitmaps go first
+            while len(self._masks) > self._max_masks:
+                self._masks.popitem(last=False)
+        return bitmap
+
+    def _evaluate(self, column, op, value) -> np.ndarray:
+        if op == 'eq':
+            return (self.df[column] == value).to_numpy()
+        if op == 'between':
+            return self.df[column].between(*value).to_numpy()
+        if op == 'isin':
+            return self.df[column].isin(value).to_numpy()
+        if op == 'contains':
+            # Substring search goes through the trigram index instead of the strings
+            index = self._text_index(column)
+            matches = np.zeros(len(self.df), dtype=bool)
+            matches[index.rows(index.search(value))] = True
+            return matches
+        raise ValueError(f"Unknown filter operation: {op}")
+
+    def select(self, predicates: list) -> pd.DataFrame:
+        """Rows matching every predicate, materialized once."""
+        bitmap = None
+        for predicate in predicates:
+            mask = self.mask(*predicate)
+            bitmap = mask if bitmap is None else bitmap & mask
+        if bitmap is None:
+            return self.df
+        return self.df[np.unpackbits(bitmap, count=len(self.df)).view(bool)]
+
+
+def age_group_options(min_age: int, max_age: int) -> dict:
+    """Age groups of the sidebar filter and their (min, max) age range.
+
+    The oldest group is open-ended: its range ends at MAX_AGE rather than at the
+    oldest age of the data, so it means the same for every year of data.
+    """
+    return {
+        'All': (min_age, max_age),
+        '90 and more': (90, MAX_AGE),
+        '75-89': (75, 89),
+        '60-74': (60, 74),
+        '40-59': (40, 59),
+        '20-39': (20, 39),
+        '20 and less': (0, 19)
+    }
+
+
+def normalize_search(text: str) -> str:
+    """Search box text as every filter reads it: surrounding whitespace is ignored."""
+    return text.strip()
+
+
+def filter_predicates(gender: str, age_range=None, prenom='', exclusive=False, communes=None) -> list:
+    """Predicates of the sidebar filters; 'All', None and '' leave a filter off.
+
+    `communes` are the commune of birth names a place of birth search resolved to.
+    `prenom` is expected to be normalized (normalize_search), like the text
+    filter_signature is computed from, so that equal signatures give equal predicates.
+    """
+    predicates = []
+    if gender != 'All':
+        predicates.append(('sexeCategorical', 'eq', gender))
+    if communes is not None:
+        predicates.append(('commnaiss', 'isin', tuple(communes)))
+    if prenom and not exclusive:
+        predicates.append(('prenom', 'contains', prenom.casefold()))
+    elif prenom and exclusive:
+        # Only people with this exact first name
+        predicates.append(('prenom', 'eq', str.upper(prenom)))
+    if age_range is not None:
+        predicates.append(('age', 'between', age_range))
+    return predicates
@@ -0,0 +1,171 @@
+import json
+import sys
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Bundled department polygons (pre-simplified with `python -m utils.geo <departements.geojson>`)
+GEOJSON_PATH = Path(__file__).resolve().parent.parent / "assets" / "departements.geojson"
+# Simplification tolerance in degrees (~500 m), invisible at the scale of the map
+DEFAULT_TOLERANCE = 0.005
+
+DEPARTMENT_NAMES = {
+    '01': 'Ain', '02': 'Aisne', '03': 'Allier', '04': 'Alpes-de-Haute-Provence',
+    '05': 'Hautes-Alpes', '06': 'Alpes-Maritimes', '07': 'Ardèche', '08': 'Ardennes',
+    '09': 'Ariège', '10': 'Aube', '11': 'Aude', '12': 'Aveyron', '13': 'Bouches-du-Rhône',
+    '14': 'Calvados', '15': 'Cantal', '16': 'Charente', '17': 'Charente-Maritime',
+    '18': 'Cher', '19': 'Corrèze', '2A': 'Corse-du-Sud', '2B': 'Haute-Corse',
+    '21': 'Côte-d\'Or', '22': 'Côtes-d\'Armor', '23': 'Creuse', '24': 'Dordogne',
+    '25': 'Doubs', '26': 'Drôme', '27': 'Eure',
+    '28': 'Eure-et-Loir', '29': 'Finistère', '30': 'Gard', '31': 'Haute-Garonne',
+    '32': 'Gers', '33': 'Gironde', '34': 'Hérault', '35': 'Ille-et-Vilaine',
+    '36': 'Indre', '37': 'Indre-et-Loire', '38': 'Isère', '39': 'Jura', '40': 'Landes',
+    '41': 'Loir-et-Cher', '42': 'Loire', '43': 'Haute-Loire', '44': 'Loire-Atlantique',
+    '45': 'Loiret', '46': 'Lot', '47': 'Lot-et-Garonne', '48': 'Lozère', '49': 'Maine-et-Loire',
+    '50': 'Manche', '51': 'Marne', '52': 'Haute-Marne', '53': 'Mayenne', '54': 'Meurthe-et-Moselle',
+    '55': 'Meuse', '56': 'Morbihan', '57': 'Moselle', '58': 'Nièvre', '59': 'Nord',
+    '60': 'Oise', '61': 'Orne', '62': 'Pas-de-Calais', '63': 'Puy-de-Dôme',
+    '64': 'Pyrénées-Atlantiques', '65': 'Hautes-Pyrénées', '66': 'Pyrénées-Orientales',
+    '67': 'Bas-Rhin', '68': 'Haut-Rhin', '69': 'Rhône', '70': 'Haute-Saône',
+    '71': 'Saône-et-Loire', '72': 'Sarthe', '73': 'Savoie', '74': 'Haute-Savoie',
+    '75': 'Paris', '76': 'Seine-Maritime', '77': 'Seine-et-Marne', '78': 'Yvelines',
+    '79': 'Deux-Sèvres', '80': 'Somme', '81': 'Tarn', '82': 'Tarn-et-Garonne',
+    '83': 'Var', '84': 'Vaucluse', '85': 'Vendée', '86': 'Vienne', '87': 'Haute-Vienne',
+    '88': 'Vosges', '89': 'Yonne', '90': 'Territoire de Belfort', '91': 'Essonne',
+    '92': 'Hauts-de-Seine', '93': 'Seine-Saint-Denis', '94': 'Val-de-Marne', '95': 'Val-d\'Oise',
+    '971': 'Guadeloupe', '972': 'Martinique', '973': 'Guyane', '974': 'La Réunion', '976': 'Mayotte',
+}
+
+# Regions (2016 boundaries) and their departments
+REGION_DEPARTMENTS = {
+    'Auvergne-Rhône-Alpes': ['01', '03', '07', '15', '26', '38', '42', '43', '63', '69', '73', '74'],
+    'Bourgogne-Franche-Comté': ['21', '25', '39', '58', '70', '71', '89', '90'],
+    'Bretagne': ['22', '29', '35', '56'],
+    'Centre-Val de Loire': ['18', '28', '36', '37', '41', '45'],
+    'Corse': ['2A', '2B'],
+    'Grand Est': ['08', '10', '51', '52', '54', '55', '57', '67', '68', '88'],
+    'Hauts-de-France': ['02', '59', '60', '62', '80'],
+    'Île-de-France': ['75', '77', '78', '91', '92', '93', '94', '95'],
+    'Normandie': ['14', '27', '50', '61', '76'],
+    'Nouvelle-Aquitaine': ['16', '17', '19', '23', '24', '33', '40', '47', '64', '79', '86', '87'],
+    'Occitanie': ['09', '11', '12', '30', '31', '32', '34', '46', '48', '65', '66', '81', '82'],
+    'Pays de la Loire': ['44', '49', '53', '72', '85'],
+    'Provence-Alpes-Côte d\'Azur': ['04', '05', '06', '13', '83', '84'],
+    'Guadeloupe': ['971'], 'Martinique': ['972'], 'Guyane': ['973'], 'La Réunion': ['974'], 'Mayotte': ['976'],
+}
+DEPARTMENT_REGIONS = {dept: region for region, depts in REGION_DEPARTMENTS.items() for dept in depts}
+
+
+def department_code(commune: str):
+    """Department of an INSEE commune code: 2 characters, 3 overseas, None abroad (99)."""
+    prefix = commune[:2]
+    if prefix == '99':
+        return None
+    if prefix in ('97', '98'):
+        return commune[:3]
+    return prefix
+
+
+def department_codes(communes: pd.Series) -> pd.Series:
+    """Vectorized department_code(), evaluated once per distinct commune code."""
+    communes = communes.astype('category')
+    departments = np.array([department_code(str(c)) for c in communes.cat.categories] + [None], dtype=object)
+    # Missing communes have code -1, which picks the trailing None
+    return pd.Series(departments[communes.cat.codes.to_numpy()], index=communes.index, dtype='category')
+
+
+
+def department_regions(departments: pd.Series) -> pd.Series:
+    """Region of each department code (None when unknown), evaluated once per distinct code."""
+    departments = departments.astype('category')
+    regions = np.array([DEPARTMENT_REGIONS.get(str(d)) for d in departments.cat.categories] + [None], dtype=object)
+    return pd.Series(regions[departments.cat.codes.to_numpy()], index=departments.index, dtype='category')
+
+
+
+def commune_name_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Deaths per (code, name) pair of the communes of birth."""
+    return df.groupby(['lieunaiss', 'commnaiss'], observed=True).size().rename('deaths').reset_index()
+
+
+def commune_lookup(counts: pd.DataFrame) -> pd.DataFrame:
+    """Every (code, name) pair of the communes of birth and its deaths, from the name counts of
+    one or more partitions.
+
+    A code is not reduced to one name: births abroad share the code of their
+    country while the name holds the city, and merged communes share a code too.
+    """
+    counts = counts.astype({'lieunaiss': str, 'commnaiss': str})
+    return counts.groupby(['lieunaiss', 'commnaiss'])['deaths'].sum().reset_index()
+
+
+def search_communes(lookup: pd.DataFrame, query: str) -> tuple:
+    """Names of the communes of birth that contain `query`, ignoring case."""
+    names = lookup['commnaiss'].drop_duplicates()
+    return tuple(names[names.str.casefold().str.contains(query.casefold(), regex=False)].sort_values())
+
+
+def simplify_ring(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of one closed ring of (lon, lat) points."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        else:
+            # Closed ring: the first and last points coincide
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack += [(start, split), (split, end)]
+    simplified = points[keep]
+    # A ring needs at least four points (three corners plus the closing one)
+    return simplified if len(simplified) >= 4 else points
+
+
+def simplify_geojson(geojson: dict, tolerance: float) -> dict:
+    """Simplify every (Multi)Polygon and round coordinates to the tolerance."""
+    decimals = max(0, int(-np.floor(np.log10(tolerance))) + 1)
+
+    def ring(coordinates):
+        return np.round(simplify_ring(np.asarray(coordinates, dtype=float), tolerance), decimals).tolist()
+
+    features = []
+    for feature in geojson['features']:
+        geometry = feature['geometry']
+        if geometry['type'] == 'Polygon':
+            coordinates = [ring(r) for r in geometry['coordinates']]
+        else:
+            coordinates = [[ring(r) for r in polygon] for polygon in geometry['coordinates']]
+        features.append({**feature, 'geometry': {'type': geometry['type'], 'coordinates': coordinates}})
+    return {**geojson, 'features': features}
+
+
+@lru_cache(maxsize=None)
+def load_departments_geojson(tolerance=DEFAULT_TOLERANCE):
+    """Bundled department geometry simplified to `tolerance`, built once per process.
+
+    Returns None when the bundled file is missing.
+    """
+    if not GEOJSON_PATH.exists():
+        return None
+    return simplify_geojson(json.loads(GEOJSON_PATH.read_text(encoding='utf-8')), tolerance)
+
+
+if __name__ == '__main__':
+    # Bundle a full-resolution GeoJSON, whose features have `code` and `nom` properties, as the app's asset
+    source = json.loads(Path(sys.argv[1]).read_text(encoding='utf-8'))
+    tolerance = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TOLERANCE
+    GEOJSON_PATH.parent.mkdir(parents=True, exist_ok=True)
+    GEOJSON_PATH.write_text(json.dumps(simplify_geojson(source, tolerance), separators=(',', ':')), encoding='utf-8')
+    print(f"Simplified geometry saved in {GEOJSON_PATH}")
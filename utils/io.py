@@ -1,17 +1,234 @@
-from pathlib import Path
+from functools import lru_cache, partial
+import json
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 import streamlit as st
+from utils.backend import DatasetBackend
+from utils.cache import AggregateCache, Selection
+from utils.cube import (
+    BASELINE_KEYS, CUBE_ROLLUPS, filter_cube, heavy_hitters, merge_baseline, merge_cube, merge_name_stats,
+    select_baseline, select_name_stats,
+)
+from utils.filters import FilterEngine
+from utils.geo import commune_lookup
+from utils.prep import (
+    BASELINE_PATH, BASELINE_YEARS, CLEANED_PATH, COMMUNES_PATH, CUBE_PATH, MANIFEST_PATH, NAMES_PATH, SNAPSHOT_PATH,
+    dataset_version, load_manifest, prewarm_path,
+)
+from utils.profiling import stage
+from utils.search import TextIndex
 
-# load_data(), load the cleaned data (Parquet only)
-@st.cache_data
-def load_data():
-    base_path = Path(__file__).resolve().parent
-    data_path = base_path.parent / "data"
-    parquet_path = data_path / "Deces_cleaned.parquet"
-
-    if parquet_path.exists():
-        print(f"Loading from {parquet_path}")
-        df = pd.read_parquet(parquet_path)
-        return df
+# Columns the dashboard actually reads; everything else stays on disk
+DASHBOARD_COLUMNS = (
+    'datedeces', 'mois_deces', 'annee_deces', 'annee_naiss', 'age',
+    'sexeCategorical', 'prenom', 'commnaiss', 'dept_deces',
+)
+
+# DECES_BACKEND=dataset answers the filters with scans of the Parquet partitions instead of
+# loading the rows in memory, for datasets that do not fit in one worker
+BACKEND = os.environ.get('DECES_BACKEND', 'memory')
+
+# Views of the shared, read-only data must never write through to it (always on from pandas 3)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+# Every loader takes the dataset version (utils.prep.dataset_version) as its first argument: a
+# partition finished by a background build changes the version, and the data is reloaded.
+# Only the current version is kept.
+
+# Key of the snapshot's schema metadata holding the version of the partitions it was built from
+SNAPSHOT_VERSION_KEY = b'deces_files_version'
+# Per-partition tables kept by load_partition(): a few rollups per partition, plus the ones
+# of the partitions rebuilt since the server started
+PARTITION_CACHE_ENTRIES = 1024
+
+@st.cache_resource(max_entries=1)
+def load_table(version):
+    """Memory-mapped Arrow table of the cleaned dataset, opened once per process and version.
+
+    The Parquet partitions are converted to an uncompressed single-chunk Arrow
+    file whenever they change, so every column can be viewed without a copy and
+    the pages are shared with the other processes through the OS page cache.
+    The snapshot records the version of the partitions it holds: a new baseline
+    file changes the dataset version, but not the rows, and reuses it.
+    """
+    if not MANIFEST_PATH.exists():
+        raise FileNotFoundError("No cleaned dataset found in data/Deces_cleaned.")
+    files_version = dataset_version(load_manifest(), 'files').encode()
+    if snapshot_version() != files_version:
+        print(f"Building {SNAPSHOT_PATH} from {CLEANED_PATH}")
+        # Reads every per-year partition of the dataset directory
+        table = ds.dataset(CLEANED_PATH, format='parquet').to_table().unify_dictionaries().combine_chunks()
+        table = table.replace_schema_metadata({**table.schema.metadata, SNAPSHOT_VERSION_KEY: files_version})
+        tmp_path = SNAPSHOT_PATH.with_name('.' + SNAPSHOT_PATH.name)
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, SNAPSHOT_PATH)
+        del table
+    print(f"Loading from {SNAPSHOT_PATH}")
+    with pa.memory_map(str(SNAPSHOT_PATH)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def snapshot_version():
+    """Version of the partitions the snapshot was built from, or None without a snapshot."""
+    try:
+        with pa.memory_map(str(SNAPSHOT_PATH)) as source:
+            return (pa.ipc.open_file(source).schema.metadata or {}).get(SNAPSHOT_VERSION_KEY)
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+
+
+# load_data(), load the cleaned data
+@st.cache_resource(max_entries=1)
+def load_data(version, columns=None):
+    """Read-only DataFrame view of the cleaned dataset, restricted to `columns` when given.
+
+    Shared by every session of the process: the numeric and category-code arrays
+    point into the memory-mapped table instead of being copied per rerun.
+    """
+    table = load_table(version)
+    return table.select(list(columns) if columns else table.column_names).to_pandas(split_blocks=True)
+
+
+@st.cache_resource(max_entries=PARTITION_CACHE_ENTRIES)
+def load_partition(path, entry):
+    """Arrow table of one partition's aggregates, read once per build of the partition.
+
+    `entry` is the partition's manifest entry (as JSON), which changes whenever
+    the partition is rebuilt.
+    """
+    return pq.read_table(path)
+
+
+def read_partitions(directory) -> pd.DataFrame:
+    """The aggregates of every partition of `directory`, as one DataFrame.
+
+    Only the partitions added or rebuilt since the last call are read: a new
+    drop does not reread the aggregates of the years before it.
+    """
+    entries = load_manifest()['files'].values()
+    tables = [load_partition(directory / entry['partition'], json.dumps(entry, sort_keys=True)) for entry in entries]
+    return pa.concat_tables(tables).unify_dictionaries().to_pandas()
+
+
+@st.cache_resource(max_entries=1)
+def load_cube(version):
+    """Load the pre-aggregated death counts, one DataFrame per rollup."""
+    return merge_cube({name: read_partitions(CUBE_PATH / name) for name in CUBE_ROLLUPS})
+
+
+@st.cache_resource(max_entries=1)
+def load_name_stats(version):
+    """Statistics of the popular first names (the only ones the first-name charts show)."""
+    return heavy_hitters(merge_name_stats([read_partitions(NAMES_PATH)]))
+
+
+@st.cache_resource(max_entries=1)
+def load_baseline(version):
+    """Monthly deaths of the baseline years before 2020 (empty when none of their files was ingested)."""
+    # The baseline files, next to the late registrations counted from the dashboard's own files
+    years = [year for year in (int(path.stem.split('_')[1]) for path in BASELINE_PATH.glob('[!.]*.parquet'))
+             if year in BASELINE_YEARS]
+    if not years:
+        return pd.DataFrame(columns=BASELINE_KEYS + ['deaths', 'age_max'])
+    # The same cell can be counted in two files (deaths registered the year after). A year
+    # whose own file is missing would only hold those late deaths, so it is left out.
+    baseline = merge_baseline([pd.read_parquet(BASELINE_PATH)])
+    return baseline[baseline['annee_deces'].isin(years)].reset_index(drop=True)
+
+
+@st.cache_resource(max_entries=1)
+def load_communes(version):
+    """(code, name) pairs of the communes of birth, to resolve place searches to names."""
+    return commune_lookup(pd.read_parquet(COMMUNES_PATH))
+
+
+# One index per searchable column
+@st.cache_resource(max_entries=2)
+def load_text_index(version, column):
+    """Substring index over one text column of the dashboard data, built once per process."""
+    return TextIndex(load_data(version, DASHBOARD_COLUMNS)[column])
+
+
+@st.cache_resource(max_entries=1)
+def load_name_index(version):
+    """Substring index over every first name of the per-name statistics, for the out-of-core backend."""
+    return TextIndex(read_partitions(NAMES_PATH)['prenom'].drop_duplicates())
+
+
+@st.cache_resource(max_entries=1)
+def load_filter_engine(version):
+    """Filter engine over the dashboard data, shared by every session of the process."""
+    return FilterEngine(load_data(version, DASHBOARD_COLUMNS), partial(load_text_index, version))
+
+
+@st.cache_resource(max_entries=1)
+def load_backend(version):
+    """Out-of-core query backend over the Parquet partitions."""
+    return DatasetBackend(CLEANED_PATH)
+
+
+@st.cache_resource
+def load_aggregate_cache():
+    """Chart aggregates shared by every session of the process (see utils.cache)."""
+    return AggregateCache()
+
+
+@st.cache_resource(max_entries=1)
+def load_prewarmed(version):
+    """Seed the aggregate cache with the aggregates utils.prewarm saved for this version.
+
+    Returns the number of aggregates loaded (0 when the version was not prewarmed).
+    """
+    path = prewarm_path(version)
+    if not path.exists():
+        return 0
+    entries = pd.read_pickle(path)
+    load_aggregate_cache().update(entries)
+    return len(entries)
+
+
+def make_selection(version, engine, key, predicates, gender, age_range, prenom='', commune=''):
+    """The charts' data for one filter combination, from the backend in use.
+
+    `engine` is the in-memory filter engine, or None for the out-of-core backend.
+    `gender` and `age_range` are the raw widget values the cube is filtered on.
+    """
+    # The excess mortality baseline answers the gender and age group filters, whatever the backend
+    baseline = lambda: select_baseline(load_baseline(version), predicates)
+    # Without a text search, the charts read the pre-aggregated cube instead of the rows
+    if commune or prenom:
+        cube = lambda: None
+    else:
+        cube = lambda: filter_cube(load_cube(version), gender, age_range)
+    # The first-name charts read the popular-name table, unless the place of birth is filtered
+    if commune:
+        name_stats = lambda: None
     else:
-        raise FileNotFoundError("No Deces_cleaned.parquet file found.")
+        name_stats = lambda: select_name_stats(load_name_stats(version), predicates)
+    if engine is None:
+        # Out-of-core: a text search is pushed down to a scan that only returns aggregates
+        @lru_cache(maxsize=None)
+        def scan():
+            with stage('dataset scan'):
+                return load_backend(version).aggregate(predicates)
+        table_stats = name_stats
+
+        def name_stats():
+            # The scan also answers what the name table cannot (e.g. an age range within a band)
+            stats = table_stats()
+            return scan()[1] if stats is None else stats
+        if commune or prenom:
+            cube = lambda: scan()[0]
+        return Selection(key, rows=lambda: None, cube=cube, name_stats=name_stats, baseline=baseline)
+
+    # Each filter is a cached row bitmap; only the widget that changed is recomputed
+    def select_rows():
+        with stage('filter rows'):
+            return engine.select(predicates)
+    return Selection(key, rows=select_rows, cube=cube, name_stats=name_stats, baseline=baseline)
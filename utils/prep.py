@@ -1,98 +1,591 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from utils.cube import CUBE_ROLLUPS, build_baseline, build_cube, build_name_stats, merge_baseline
+from utils.geo import commune_name_counts, department_codes, department_regions
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+# DECES_DATA_DIR points the whole pipeline at another data directory (e.g. benchmark data)
+DATA_PATH = Path(os.environ.get("DECES_DATA_DIR", BASE_PATH / "data"))
+# One Parquet partition per source CSV, plus a manifest of the source hashes
+CLEANED_PATH = DATA_PATH / "Deces_cleaned"
+MANIFEST_PATH = CLEANED_PATH / "_manifest.json"
+# Held (with the builder's pid) while a build runs, so concurrent visitors never start a second one
+BUILD_LOCK_PATH = CLEANED_PATH / "_build.lock"
+# Traceback of the last failed background build, with the signature of the source files it read
+BUILD_ERROR_PATH = CLEANED_PATH / "_build.error"
+# Single-chunk Arrow IPC copy of the partitions, memory-mapped by the app
+SNAPSHOT_PATH = DATA_PATH / "Deces_cleaned.arrow"
+# Pre-aggregated death counts, one sub-directory per rollup, partitioned like the rows
+CUBE_PATH = DATA_PATH / "Deces_cube"
+# Per-first-name statistics, partitioned like the rows
+NAMES_PATH = DATA_PATH / "Deces_names"
+# Commune of birth code/name pairs, to resolve place searches to codes
+COMMUNES_PATH = DATA_PATH / "Deces_communes"
+# Monthly deaths of the BASELINE_YEARS by sex, age band and department, one file per source CSV
+# (the baseline files, and the late registrations of those years in the dashboard's files)
+BASELINE_PATH = DATA_PATH / "Deces_baseline"
+# Hashes of the identity columns of every source file, to deduplicate the files appended later
+KEYS_PATH = CLEANED_PATH / "_keys"
+# Chart aggregates precomputed by utils.prewarm, one file per dataset version
+PREWARM_PATH = DATA_PATH / "Deces_prewarm"
+# Deaths before this year are left out (COVID period onwards)
+FIRST_YEAR = 2020
+# Deaths of the five years before only feed the baseline of the excess mortality chart,
+# whichever file they were registered in
+BASELINE_YEARS = range(FIRST_YEAR - 5, FIRST_YEAR)
+# Oldest realistic age at death; older records are dropped
+MAX_AGE = 122
+# INSEE source files: yearly (Deces_2022.csv), monthly (Deces_2023_M01.csv) or quarterly (Deces_2023_T1.csv)
+SOURCE_PATTERN = re.compile(r'Deces_(\d{4})(?:_(M\d{2}|T\d))?\.csv')
+
+# Compact on-disk schema of the cleaned dataset: dictionary-encoded text columns,
+# narrow integers, and months stored as YYYYMM integer periods.
+CLEANED_DTYPES = {
+    'sexe': 'int8',
+    'lieunaiss': 'category',
+    'commnaiss': 'category',
+    'lieudeces': 'category',
+    'dept_deces': 'category',
+    'dept_naiss': 'category',
+    'region_deces': 'category',
+    'nom': 'category',
+    'prenom': 'category',
+    'age': 'int8',
+    'annee_deces': 'int16',
+    'mois_deces': 'int32',
+    'annee_naiss': 'int16',
+    'mois_naiss': 'int32',
+    'sexeCategorical': pd.CategoricalDtype(['Male', 'Female']),
+}
+# Bumped whenever the partitions' layout changes, to rebuild them all on the next run
+SCHEMA_VERSION = 7
+# Rows are sorted by date of death so each row group covers a narrow date range
+ROW_GROUP_SIZE = 128_000
+# Rows read from a source CSV at a time
+CHUNK_SIZE = 200_000
+# Raw columns identifying one death record, hashed to drop the duplicates
+IDENTITY_COLUMNS = ['nomprenom', 'sexe', 'datenaiss', 'lieunaiss', 'datedeces', 'lieudeces', 'actedeces']
+# Read as strings whatever a chunk holds: a chunk without a Corsican code would otherwise read the
+# commune codes as numbers ('07004' -> 7004, or 63012.0 next to a missing value), which changes
+# their department and their hash
+TEXT_COLUMNS = ['nomprenom', 'datenaiss', 'lieunaiss', 'commnaiss', 'paysnaiss', 'datedeces', 'lieudeces', 'actedeces']
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the cleaned columns to the compact output schema, sorted by date of death."""
+    dtypes = {col: dtype for col, dtype in CLEANED_DTYPES.items() if col in df.columns}
+    df = df.astype(dtypes)
+    return df.sort_values(['datedeces', 'sexe'], kind='stable', ignore_index=True)
+
+
+def parse_yyyymmdd(values: pd.Series):
+    """Parse YYYYMMDD numbers into datetime64[s] with integer arithmetic.
+
+    Returns the dates and a validity mask; INSEE writes unknown months and days
+    as "00", which (like any impossible date) is marked invalid and left as NaT.
+    """
+    raw = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype='int64')
+    year, month, day = raw // 10000, raw // 100 % 100, raw % 100
+    valid = (year > 0) & (month >= 1) & (month <= 12) & (day >= 1)
+    # Month starts as months since 1970, so numpy does the calendar work
+    month_start = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype('datetime64[M]')
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype('int64')
+    valid &= day <= days_in_month
+    dates = month_start.astype('datetime64[D]') + (day - 1)
+    dates[~valid] = np.datetime64('NaT')
+    return dates.astype('datetime64[s]'), valid
+
+
+def exact_age(datenaiss: pd.Series, datedeces: pd.Series) -> pd.Series:
+    """Age in completed calendar years between two YYYYMMDD numbers."""
+    years = datedeces // 10000 - datenaiss // 10000
+    # One year less if the birthday (MMDD) had not come yet in the year of death
+    return years - (datedeces % 10000 < datenaiss % 10000).astype('int64')
 
-def cleaning():
-    base_path = Path(__file__).resolve().parent.parent
-    data_path = base_path / "data"
-    # Only use 2020–2022 CSVs
-    csv_files = [data_path / f"Deces_{year}.csv" for year in [2020, 2021, 2022] if (data_path / f"Deces_{year}.csv").exists()]
-    if not csv_files:
-        raise FileNotFoundError("No 2020–2022 CSV files found in data directory.")
-    chunks = []
-    for csv_file in csv_files:
-        print(f"Reading {csv_file.name}")
-        for chunk in pd.read_csv(csv_file, sep=';', low_memory=False, chunksize=200_000):
-            chunks.append(chunk)
-    df = pd.concat(chunks, ignore_index=True)
-    print(f"Loaded {len(df):,} rows from 2020–2022 CSVs.")
-
-    # Basic diagnostics
-    print('NA counts:')
-    print(df.isna().sum())
-    print('\nDtypes:')
-    print(df.dtypes)
-    print('\nDescribe (sample):')
-    print(df.describe())
-    print('\nInfo:')
-    print(df.info())
-    # Check for duplicates
-    print('\nDuplicates:')
-    print(df.duplicated().sum())
-
-    # drop duplicates
-    df = df.drop_duplicates()
+
+def clean_frame(df: pd.DataFrame, stats: Counter, verbose=False, years=None) -> pd.DataFrame:
+    """Apply the cleaning steps to one chunk of raw rows (already deduplicated).
+
+    Only the deaths of `years` are kept (the BASELINE_YEARS and FIRST_YEAR on by
+    default). The number
+    of rows dropped by each step is added to `stats`; verbose also counts the
+    missing values of every raw column.
+    """
+    if verbose:
+        for column, count in df.isna().sum().items():
+            stats[f'missing_{column}'] += int(count)
 
     # drop useless column
     df = df.drop(columns=['actedeces', 'paysnaiss'], errors='ignore')
 
     # drop na
+    before = len(df)
     df = df.dropna(subset=['lieunaiss', 'lieudeces'])
-    # Basic diagnostics after initial cleaning    
-    print('NA counts:')
-    print(df.isna().sum())
-    print(f"\nData shape after dropping duplicates and NAs: {df.shape}")
+    stats['dropped_missing_place'] += before - len(df)
     # split nomprenom into nom and prenom if present
     if 'nomprenom' in df.columns:
-        df[['nom', 'prenom']] = df['nomprenom'].astype(str).str.split('*', n=1, expand=True)
+        # (reindexed so that a chunk left empty by the deduplication still gets both columns)
+        df[['nom', 'prenom']] = df['nomprenom'].astype(str).str.split('*', n=1, expand=True).reindex(columns=[0, 1])
         # remove trailing slash from prenom if present
         if 'prenom' in df.columns:
             df['prenom'] = df['prenom'].astype(str).str.rstrip('/')
-        print('\nSplit nom/prenom sample:')
-        print(df[['nom', 'prenom']].head())
 
         # Remove the original nomprenom column
         df.drop(columns=['nomprenom'], inplace=True, errors='ignore')
 
-    # transform date fields to datetime if present
+    # Parse YYYYMMDD dates straight from the numeric columns, dropping invalid ones
     date_cols = ['datedeces', 'datenaiss']
+    valid = np.ones(len(df), dtype=bool)
     for col in date_cols:
-        df[col] = pd.to_datetime(df[col].astype(str), format='%Y%m%d', errors='coerce')
-    
-    # Drop rows where date parsing failed
-    print(df.isna().sum())
-    df.dropna(subset=['datedeces', 'datenaiss'], inplace=True)
-    if date_cols:
-        print('\nParsed date columns sample:')
-        print(df[date_cols].head())
-    
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int64')
+        valid &= parse_yyyymmdd(df[col])[1]
+    stats['dropped_invalid_date'] += int((~valid).sum())
+    df = df[valid]
+
     # Calculate age and filter unrealistic ages
-    print(df.info())
-    df['age'] = ((df['datedeces'] - df['datenaiss']).dt.days / 365.25).astype(int)
-    df = df[(df['age'] >= 0) & (df['age'] <= 122)]
-
-    # Check for age variations
-    print('\nAge variations:')
-    print(df['age'].unique())
-
-    # Check for shape after age filtering
-    print(f"\nData shape after removing unrealistic ages: {df.shape}")
-
-    # Extract year and month from dates
-    df['annee_deces'] = df['datedeces'].dt.year
-    df['mois_deces'] = df['datedeces'].dt.to_period('M').astype(str)
-    df['annee_naiss'] = df['datenaiss'].dt.year
-    df['mois_naiss'] = df['datenaiss'].dt.to_period('M').astype(str)
+    df['age'] = exact_age(df['datenaiss'], df['datedeces'])
+    before = len(df)
+    df = df[(df['age'] >= 0) & (df['age'] <= MAX_AGE)]
+    stats['dropped_unrealistic_age'] += before - len(df)
+
+    # Extract year and month from the YYYYMMDD numbers, then convert to datetimes
+    df['annee_deces'] = df['datedeces'] // 10000
+    df['mois_deces'] = df['datedeces'] // 100
+    df['annee_naiss'] = df['datenaiss'] // 10000
+    df['mois_naiss'] = df['datenaiss'] // 100
+    for col in date_cols:
+        df[col] = parse_yyyymmdd(df[col])[0]
     # Map sexe to categorical
     df['sexeCategorical'] = df['sexe'].map({1: 'Male', 2: 'Female'})
-    # Only keep deaths from 2020 to 2022 (COVID period)
-    df = df[(df['annee_deces'] >= 2020) & (df['annee_deces'] <= 2022)]
-    print('Shape after filtering to 2020–2022 (COVID period):')
-    print(df.shape)
-    # Save only as Parquet
-    output_path_parquet = Path(__file__).resolve().parent.parent / "data" / "Deces_cleaned.parquet"
-    df.to_parquet(output_path_parquet, index=False)
-    print(f"Cleaned data saved in {output_path_parquet}")
-    print(df.head())
+    # Only keep deaths from 2020 on (COVID period), or from the baseline years
+    before = len(df)
+    df = df[df['annee_deces'] >= BASELINE_YEARS.start] if years is None else df[df['annee_deces'].isin(years)]
+    stats['dropped_out_of_period'] += before - len(df)
+    # Departments (2A/2B for Corsica, 3 characters overseas) and region, so geographic
+    # breakdowns group by a small categorical column instead of slicing commune codes
+    df['dept_deces'] = department_codes(df['lieudeces']).to_numpy()
+    df['dept_naiss'] = department_codes(df['lieunaiss']).to_numpy()
+    df['region_deces'] = department_regions(df['dept_deces']).to_numpy()
+    return df
+
+
+def identity_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of the columns identifying one death record, one per row."""
+    return pd.util.hash_pandas_object(df[[c for c in IDENTITY_COLUMNS if c in df.columns]], index=False).to_numpy()
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a source file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest() -> dict:
+    """Return the build manifest: source file name -> hash, partition and row count, for the
+    dashboard's files and for the baseline files."""
+    if MANIFEST_PATH.exists():
+        manifest = json.loads(MANIFEST_PATH.read_text())
+        # Partitions written with another output schema are rebuilt
+        if manifest.get('schema_version') == SCHEMA_VERSION:
+            manifest.setdefault('baseline', {})
+            return manifest
+    return {'schema_version': SCHEMA_VERSION, 'files': {}, 'baseline': {}}
+
+
+def save_manifest(manifest: dict):
+    tmp_path = MANIFEST_PATH.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def dataset_version(manifest: dict, kind=None) -> str:
+    """Fingerprint of the cleaned dataset, which changes whenever a partition is rebuilt.
+
+    With `kind` ('files' or 'baseline'), only the partitions of that kind are
+    fingerprinted: e.g. the rows do not change when a baseline file is added.
+    """
+    if kind is not None:
+        manifest = {'schema_version': manifest['schema_version'], kind: manifest[kind]}
+    return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def dataset_period(manifest: dict) -> str:
+    """Years of the source files ingested in the dashboard's dataset, e.g. '2020-2022', for the labels."""
+    years = sorted({int(SOURCE_PATTERN.fullmatch(name).group(1)) for name in manifest['files']}) or [FIRST_YEAR]
+    return str(years[0]) if years[0] == years[-1] else f"{years[0]}-{years[-1]}"
+
+
+def prewarm_path(version: str) -> Path:
+    """File of the chart aggregates prewarmed for a dataset version.
+
+    The name also fingerprints every module of utils/, which select the rows, key
+    and compute the aggregates (down to the department names of geo.py), so a
+    deploy that changes them never loads aggregates computed by the old code.
+    """
+    modules = sorted((BASE_PATH / 'utils').glob('*.py'))
+    code = hashlib.sha256(b''.join(module.read_bytes() for module in modules)).hexdigest()[:8]
+    return PREWARM_PATH / f"{version}-{code}.pkl"
+
+
+def partition_paths(partition: str) -> list:
+    """Every file written for one source partition: the cleaned rows, each cube rollup, the name
+    statistics, the commune names, the baseline of its late registrations, then its keys."""
+    keys_path = KEYS_PATH / partition.replace('.parquet', '.npy')
+    return ([CLEANED_PATH / partition] + [CUBE_PATH / name / partition for name in CUBE_ROLLUPS]
+            + [NAMES_PATH / partition, COMMUNES_PATH / partition, BASELINE_PATH / partition, keys_path])
+
+
+def output_paths(kind: str, partition: str) -> list:
+    """Files written for one source partition of the manifest's `kind` ('files' or 'baseline')."""
+    return partition_paths(partition) if kind == 'files' else [BASELINE_PATH / partition]
+
+
+def load_keys(partitions: list) -> np.ndarray:
+    """Sorted identity hashes of every record of the given partitions."""
+    keys = [np.load(partition_paths(partition)[-1]) for partition in partitions]
+    return np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype='uint64')
+
+
+def write_parquet(df: pd.DataFrame, path: Path):
+    # Write next to the final file and swap it in, so readers never see a partial partition
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name('.' + path.name)
+    # Same int32 dictionary indices in every partition, whatever its number of categories,
+    # so the partitions share one schema and can be read as a single dataset (an empty
+    # partition, e.g. a drop superseded by its yearly file, has no values to type its strings)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            value_type = pa.string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), value_type)))
+    df.to_parquet(tmp_path, index=False, schema=schema, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+
+def write_keys(keys: np.ndarray, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name('.' + path.name)
+    np.save(tmp_path, keys)
+    os.replace(tmp_path, path)
+
+
+def clean_chunks(csv_file: Path, stats: Counter, verbose=False, known=None, years=None):
+    """Stream the cleaned chunks of one source CSV, each with the hashes of the new records it read.
+
+    Records are deduplicated on the hash of the identity columns as the file is
+    read, and the ones whose hash is in `known` are dropped as well.
+    """
+    known = np.empty(0, dtype='uint64') if known is None else known
+    # Sorted hashes of the records already read from this file
+    seen = np.empty(0, dtype='uint64')
+    dtypes = dict.fromkeys(TEXT_COLUMNS, str)
+    for chunk in pd.read_csv(csv_file, sep=';', dtype=dtypes, low_memory=False, chunksize=CHUNK_SIZE):
+        stats['rows_read'] += len(chunk)
+        keys = identity_hashes(chunk)
+        new = ~pd.Series(keys).duplicated().to_numpy() & ~np.isin(keys, seen)
+        stats['dropped_duplicates'] += int((~new).sum())
+        seen = np.union1d(seen, keys[new])
+        ingested = np.isin(keys, known) & new
+        stats['dropped_already_ingested'] += int(ingested.sum())
+        yield clean_frame(chunk[new & ~ingested], stats, verbose, years), keys[new]
+
+
+def clean_year(csv_file: Path, partition: str, verbose=False, known=None):
+    """Clean one source CSV into its own Parquet partition.
+
+    The CSV is streamed in chunks, deduplicated on the hash of the identity
+    columns as it goes, so only the cleaned rows of the file are ever held in
+    memory. Records whose hash is in `known` (the key index of the files
+    ingested before) are dropped as well. The deaths of the BASELINE_YEARS
+    registered late in the file are counted into its own baseline file.
+    Returns the row count and the cleaning statistics.
+    """
+    print(f"Reading {csv_file.name}")
+    stats = Counter()
+    chunks, baselines, keys = [], [], []
+    for chunk, new_keys in clean_chunks(csv_file, stats, verbose, known):
+        late = (chunk['annee_deces'] < FIRST_YEAR).to_numpy()
+        baselines.append(build_baseline(chunk[late]))
+        chunks.append(chunk[~late])
+        keys.append(new_keys)
+    df = apply_schema(pd.concat(chunks, ignore_index=True))
+    del chunks
+    seen = np.sort(np.concatenate(keys))
+    stats['rows_kept'] = len(df)
+    rows_path, *cube_paths, names_path, communes_path, baseline_path, keys_path = partition_paths(partition)
+    for rollup, path in zip(build_cube(df).values(), cube_paths):
+        write_parquet(rollup, path)
+    write_parquet(build_name_stats(df), names_path)
+    write_parquet(commune_name_counts(df), communes_path)
+    stats['baseline_deaths'] = write_baseline(baselines, baseline_path)
+    write_parquet(df, rows_path)
+    write_keys(seen, keys_path)
+    print(f"Cleaned data saved in {rows_path}: {len(df):,} of {stats['rows_read']:,} rows kept")
+    return len(df), dict(stats)
+
+
+def clean_baseline(csv_file: Path, partition: str, verbose=False):
+    """Count the deaths of the BASELINE_YEARS in one source CSV into its baseline file.
+
+    Each chunk is cleaned like the dashboard's rows, so both periods are counted
+    the same way, then aggregated right away: the rows are never kept. Returns
+    the number of deaths counted and the cleaning statistics.
+    """
+    print(f"Reading {csv_file.name} (baseline)")
+    stats = Counter()
+    parts = [build_baseline(chunk) for chunk, _ in clean_chunks(csv_file, stats, verbose, years=BASELINE_YEARS)]
+    stats['rows_kept'] = write_baseline(parts, BASELINE_PATH / partition)
+    print(f"Baseline saved in {BASELINE_PATH / partition}: {stats['rows_kept']:,} deaths")
+    return stats['rows_kept'], dict(stats)
+
+
+def write_baseline(parts: list, path: Path) -> int:
+    """Merge the baselines of the chunks of one source CSV into its baseline file; returns its deaths."""
+    baseline = merge_baseline(parts).astype({
+        'annee_deces': 'int16', 'mois': 'int8', 'sexeCategorical': CLEANED_DTYPES['sexeCategorical'],
+        'dept_deces': 'category',
+    })
+    write_parquet(baseline, path)
+    return int(baseline['deaths'].sum())
+
+
+def is_update(csv_file: Path) -> bool:
+    """Whether a source file is a monthly or quarterly drop rather than a yearly file."""
+    return SOURCE_PATTERN.fullmatch(csv_file.name).group(2) is not None
+
+
+def source_files() -> list:
+    """Source CSVs of the dataset from FIRST_YEAR on: yearly files, then the drops in publication order."""
+    matches = [(csv_file, SOURCE_PATTERN.fullmatch(csv_file.name)) for csv_file in DATA_PATH.glob('Deces_*.csv')]
+    matches = [(csv_file, match) for csv_file, match in matches if match and int(match.group(1)) >= FIRST_YEAR]
+    return [csv_file for csv_file, match in sorted(matches, key=lambda m: (m[1].group(2) is not None, m[1].groups('')))]
+
+
+def baseline_files() -> list:
+    """Yearly source CSVs of the BASELINE_YEARS (the deaths registered in a later file are counted
+    by clean_year)."""
+    matches = [(csv_file, SOURCE_PATTERN.fullmatch(csv_file.name)) for csv_file in DATA_PATH.glob('Deces_*.csv')]
+    return sorted(csv_file for csv_file, match in matches
+                  if match and not match.group(2) and int(match.group(1)) in BASELINE_YEARS)
+
+
+def cleaning(max_workers=None, verbose=False, report_path=None, append=False):
+    """Rebuild the partitions whose source CSV changed since the last run.
+
+    Yearly files are cleaned in parallel, along with the files of the
+    BASELINE_YEARS, which are only counted into the excess mortality baseline.
+    A yearly file holding records of the yearly files before it (a death
+    registered late, published again the next year) is then cleaned again
+    without them. Monthly and quarterly drops are cleaned one by one, each
+    deduplicated against the key index of the files before it. A rebuilt or
+    newly added file also rebuilds the files that follow it, so a yearly file
+    published after the drops of its year supersedes them.
+
+    append only ingests the source files missing from the manifest (and the drops
+    that follow them), without hashing or checking the files already ingested.
+
+    verbose prints the cleaning statistics of each rebuilt file (rows dropped by
+    each step, plus missing values per column); report_path also saves them as JSON.
+    """
+    csv_files, baseline_csv_files = source_files(), baseline_files()
+    if not csv_files:
+        raise FileNotFoundError(f"No {FIRST_YEAR}+ Deces_*.csv files found in data directory.")
+    CLEANED_PATH.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest()
+
+    sources = {'files': csv_files, 'baseline': baseline_csv_files}
+    if not append:
+        # Forget partitions whose source file disappeared
+        for kind, files in sources.items():
+            names = {csv_file.name for csv_file in files}
+            for name in list(manifest[kind]):
+                if name not in names:
+                    for path in output_paths(kind, manifest[kind].pop(name)['partition']):
+                        path.unlink(missing_ok=True)
+
+    todo, report = {'files': {}, 'baseline': {}}, {}
+    for kind, files in sources.items():
+        for csv_file in files:
+            entry = manifest[kind].get(csv_file.name)
+            # A file is deduplicated against every file before it: it is rebuilt when one of them was
+            # rebuilt, or was added since (e.g. the yearly file of a drop's year, published after it)
+            earlier = [f.name for f in files[:files.index(csv_file)]] if kind == 'files' else None
+            upstream_changed = kind == 'files' and (bool(todo['files']) or (entry or {}).get('earlier') != earlier)
+            if append and entry and not upstream_changed:
+                continue
+            digest = file_hash(csv_file)
+            partition = csv_file.with_suffix('.parquet').name
+            if (entry and entry['sha256'] == digest and not upstream_changed
+                    and all(path.exists() for path in output_paths(kind, entry['partition']))):
+                print(f"{csv_file.name} unchanged, skipping")
+                continue
+            todo[kind][csv_file] = {'sha256': digest, 'partition': partition}
+            if earlier is not None:
+                todo[kind][csv_file]['earlier'] = earlier
+
+    def done(kind, csv_file, result, deduplicated=True):
+        rows, report[csv_file.name] = result
+        manifest[kind][csv_file.name] = dict(todo[kind][csv_file], rows=rows)
+        if not deduplicated:
+            # Not checked against the files before it yet: rebuilt if the run stops before it is
+            manifest[kind][csv_file.name].pop('earlier')
+        save_manifest(manifest)
+        if verbose:
+            print(json.dumps({csv_file.name: report[csv_file.name]}, indent=2))
+
+    yearly = [csv_file for csv_file in todo['files'] if not is_update(csv_file)]
+    results = {}
+    if yearly or todo['baseline']:
+        # One year per worker: peak memory is bounded by the largest year, times the worker count
+        workers = min(len(yearly) + len(todo['baseline']), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(clean_year, csv_file, todo['files'][csv_file]['partition'], verbose): ('files', csv_file)
+                for csv_file in yearly
+            }
+            # Submitted last, so the dashboard's own years are served first
+            futures.update({
+                pool.submit(clean_baseline, csv_file, entry['partition'], verbose): ('baseline', csv_file)
+                for csv_file, entry in todo['baseline'].items()
+            })
+            for future in as_completed(futures):
+                kind, csv_file = futures[future]
+                results[csv_file] = future.result()
+                done(kind, csv_file, results[csv_file], deduplicated=kind == 'baseline')
+    for csv_file, entry in todo['files'].items():
+        # Key index of every file before this one
+        known = load_keys([manifest['files'][name]['partition'] for name in entry['earlier']])
+        if is_update(csv_file) or np.isin(load_keys([entry['partition']]), known).any():
+            done('files', csv_file, clean_year(csv_file, entry['partition'], verbose, known))
+        else:
+            done('files', csv_file, results[csv_file])
+    save_manifest(manifest)
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2, sort_keys=True))
+    total = sum(entry['rows'] for entry in manifest['files'].values())
+    print(f"Dataset ready in {CLEANED_PATH}: {total:,} rows in {len(manifest['files'])} partitions.")
+    if manifest['baseline']:
+        deaths = sum(entry['rows'] for entry in manifest['baseline'].values())
+        print(f"Baseline ready in {BASELINE_PATH}: {deaths:,} deaths from {len(manifest['baseline'])} files.")
+
+
+def build_status() -> dict:
+    """Source file name -> row count of its partition, or None while it is not cleaned yet."""
+    manifest = load_manifest()
+    files = {**manifest['files'], **manifest['baseline']}
+    return {csv_file.name: files.get(csv_file.name, {}).get('rows') for csv_file in source_files() + baseline_files()}
+
+
+def source_signature() -> list:
+    """Name, size and modification time of every source file, cheap enough to check on each rerun."""
+    return [[csv_file.name, csv_file.stat().st_size, csv_file.stat().st_mtime_ns]
+            for csv_file in source_files() + baseline_files()]
+
+
+def build_error():
+    """Traceback of the last failed background build, or None.
+
+    A failure is forgotten once a source file is added, removed or rewritten,
+    so that the next rerun retries the build.
+    """
+    try:
+        failure = json.loads(BUILD_ERROR_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    return failure['error'] if failure['sources'] == source_signature() else None
+
+
+def _lock_is_stale() -> bool:
+    """Whether the build lock was left behind by a process that no longer runs."""
+    try:
+        os.kill(int(BUILD_LOCK_PATH.read_text()), 0)
+    except ProcessLookupError:
+        return True
+    except (FileNotFoundError, ValueError, PermissionError):
+        # Gone already, being written, or held by another user's live process
+        return False
+    return False
+
+
+def acquire_build_lock() -> bool:
+    """Create the build lock; False when a live process already holds it."""
+    CLEANED_PATH.mkdir(parents=True, exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(BUILD_LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not _lock_is_stale():
+                return False
+            BUILD_LOCK_PATH.unlink(missing_ok=True)
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def start_cleaning() -> bool:
+    """Ingest the new source files in the background; False when a build is already running.
+
+    The build runs as a `python -m utils.prep --append` subprocess, watched by a
+    thread: its process pool is never forked from the server, whose other
+    threads may hold locks a forked worker would inherit and wait on forever.
+    The manifest is saved after each source file, so the partitions already
+    cleaned can be served while the others are still being processed.
+
+    The lock holds the subprocess' pid, so a build outliving a restarted
+    server still keeps the next one from starting a second build.
+    """
+    if not acquire_build_lock():
+        return False
+    # A new attempt: the last failure is no longer current
+    BUILD_ERROR_PATH.unlink(missing_ok=True)
+    sources = source_signature()
+
+    def failed(error):
+        BUILD_ERROR_PATH.write_text(json.dumps({'sources': sources, 'error': error}))
+
+    def build():
+        try:
+            # The build's output goes to the server log; its errors are kept for the app to show
+            process = subprocess.Popen([sys.executable, '-m', 'utils.prep', '--append'], cwd=BASE_PATH,
+                                       stderr=subprocess.PIPE, text=True)
+            BUILD_LOCK_PATH.write_text(str(process.pid))
+            _, stderr = process.communicate()
+            if process.returncode:
+                failed(stderr)
+                print(stderr, file=sys.stderr, flush=True)
+        except Exception:
+            failed(traceback.format_exc())
+            raise
+        finally:
+            BUILD_LOCK_PATH.unlink(missing_ok=True)
+
+    threading.Thread(target=build, name='cleaning', daemon=True).start()
+    return True
+
 
 if __name__ == '__main__':
-	cleaning()
\ No newline at end of file
+	# python -m utils.prep [--verbose] [--report report.json]
+	parser = argparse.ArgumentParser(description="Clean the INSEE death files into data/Deces_cleaned.")
+	parser.add_argument('--verbose', action='store_true', help="print the cleaning statistics of each file")
+	parser.add_argument('--report', help="save the cleaning statistics as JSON")
+	parser.add_argument('--append', action='store_true', help="only ingest the source files not ingested yet")
+	args = parser.parse_args()
+	cleaning(verbose=args.verbose, report_path=args.report, append=args.append)
\ No newline at end of file
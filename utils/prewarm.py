@@ -0,0 +1,74 @@
+import argparse
+import os
+import time
+from itertools import product
+import pandas as pd
+from utils.cache import filter_signature
+from utils.filters import age_group_options, filter_predicates, normalize_search
+from utils.io import BACKEND, load_cube, load_filter_engine, load_name_stats, make_selection
+from utils.prep import PREWARM_PATH, build_status, dataset_version, load_manifest, prewarm_path
+from utils.viz import AGGREGATES
+
+# Precomputes the chart aggregates of the filter combinations most users start from, so that the
+# first sessions after a deploy or a data refresh do not pay for them. The app loads the file of
+# its dataset version at startup (utils.io.load_prewarmed); replicas sharing data/ share it too.
+
+
+def sidebar_options(version):
+    """Gender options and age groups of the sidebar, as app.py derives them from the cube."""
+    cube_counts = load_cube(version)['generation']
+    genders = ['All'] + cube_counts['sexeCategorical'].unique().tolist()
+    return genders, age_group_options(int(cube_counts['age'].min()), int(cube_counts['age'].max()))
+
+
+def common_filters(version, genders, age_groups, names=(), top_names=10) -> list:
+    """(gender, age group, first name) of every gender x age group without a text search,
+    plus a substring search for each first name (the most frequent ones by default)."""
+    if not names:
+        deaths = load_name_stats(version).groupby('prenom', observed=True)['deaths'].sum()
+        names = deaths.nlargest(top_names).index.tolist()
+    return [(gender, age_group, '') for gender, age_group in product(genders, age_groups)] + [
+        ('All', 'All', name) for name in names
+    ]
+
+
+def prewarm(names=(), top_names=10):
+    """Compute every chart aggregate of the common filters and save them for this dataset version."""
+    if None in build_status().values():
+        raise SystemExit("Some source files are not cleaned yet: run `python -m utils.prep` first.")
+    start = time.perf_counter()
+    version = dataset_version(load_manifest())
+    engine = None if BACKEND == 'dataset' else load_filter_engine(version)
+    genders, age_groups = sidebar_options(version)
+    filters = common_filters(version, genders, age_groups, names, top_names)
+    entries = {}
+    for gender, age_group, prenom in filters:
+        prenom = normalize_search(prenom)
+        age_range = age_groups[age_group]
+        predicates = filter_predicates(gender, None if age_group == 'All' else age_range, prenom)
+        key = (filter_signature(gender, age_group, prenom, '', False), version)
+        # The same selection as the app builds for these filters, so the cached values match
+        selection = make_selection(version, engine, key, predicates, gender, age_range, prenom)
+        for chart, aggregate in AGGREGATES.items():
+            entries[(chart,) + key] = aggregate(selection)
+
+    PREWARM_PATH.mkdir(parents=True, exist_ok=True)
+    path = prewarm_path(version)
+    tmp_path = path.with_name('.' + path.name)
+    pd.to_pickle(entries, tmp_path)
+    os.replace(tmp_path, path)
+    # Only the current version (and code) is ever loaded
+    for old in PREWARM_PATH.glob('*.pkl'):
+        if old != path:
+            old.unlink()
+    print(f"Prewarmed {len(entries)} aggregates of {len(filters)} filter combinations "
+          f"in {time.perf_counter() - start:.1f}s: {path}")
+
+
+if __name__ == '__main__':
+    # python -m utils.prewarm [--names marie jean] [--top-names 10]
+    parser = argparse.ArgumentParser(description="Precompute the chart aggregates of the common filter combinations.")
+    parser.add_argument('--names', nargs='+', default=(), help="first-name searches to prewarm (default: the most frequent names)")
+    parser.add_argument('--top-names', type=int, default=10, help="how many of the most frequent first names to prewarm")
+    args = parser.parse_args()
+    prewarm(args.names, args.top_names)
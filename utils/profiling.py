@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+from functools import wraps
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# DECES_PROFILE=1 profiles every rerun, memory included; ?profile=1 in the URL times one session
+PROFILE_ENV = 'DECES_PROFILE'
+_current = threading.local()
+
+
+class Profiler:
+    """Wall time and peak memory of the stages of one rerun.
+
+    Stages nest (a chart inside a section); each records its own time and,
+    with `trace_memory`, the peak memory allocated above what was in use when
+    it started. Memory is traced with tracemalloc, which is process-wide and
+    slows down every session: it is started once and left on, so it is only
+    meant for a process that profiles every rerun (DECES_PROFILE=1). With
+    concurrent sessions the peaks include their allocations too.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.records = []
+        self._stack = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # A process already tracing (e.g. a benchmark) gets the peaks too
+        self._trace_memory = tracemalloc.is_tracing()
+
+    @contextmanager
+    def stage(self, name: str):
+        record = {'stage': name, 'depth': len(self._stack), 'peak_mb': None}
+        frame = None
+        if self._trace_memory:
+            if self._stack:
+                # Account for the parent's allocations so far before resetting the peak
+                self._stack[-1]['abs_peak'] = max(self._stack[-1]['abs_peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            frame = {'start': current, 'abs_peak': current}
+        self.records.append(record)
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['ms'] = round((time.perf_counter() - start) * 1000, 1)
+            self._stack.pop()
+            if frame is not None:
+                frame['abs_peak'] = max(frame['abs_peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_mb'] = round((frame['abs_peak'] - frame['start']) / 1024 ** 2, 1)
+                if self._stack:
+                    self._stack[-1]['abs_peak'] = max(self._stack[-1]['abs_peak'], frame['abs_peak'])
+                    tracemalloc.reset_peak()
+
+    def log(self, **context):
+        """Print the rerun's stages as one JSON line, with the given context (filters, section...)."""
+        total = sum(record.get('ms', 0) for record in self.records if record['depth'] == 0)
+        print(json.dumps({'event': 'rerun_profile', 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                          **context, 'total_ms': round(total, 1), 'stages': self.records}, default=str), flush=True)
+
+    def display(self):
+        """Breakdown of the rerun in a sidebar panel."""
+        import pandas as pd
+        import streamlit as st
+        with st.sidebar.expander("Profiling", expanded=True):
+            table = pd.DataFrame(self.records, columns=['stage', 'depth', 'ms', 'peak_mb'])
+            table['stage'] = [' ' * depth + stage for stage, depth in zip(table['stage'], table['depth'])]
+            st.dataframe(table.drop(columns='depth'), hide_index=True, use_container_width=True)
+
+
+def start_profiling(enabled: bool):
+    """Profiler of the current rerun (None when disabled), used by stage() and @profiled."""
+    every_rerun = os.environ.get(PROFILE_ENV) == '1'
+    _current.profiler = Profiler(trace_memory=every_rerun) if enabled or every_rerun else None
+    return _current.profiler
+
+
+@contextmanager
+def stage(name: str):
+    """Profile the enclosed block as a stage of the current rerun, if it is profiled."""
+    profiler = getattr(_current, 'profiler', None)
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def profiled(fn):
+    """Profile every call of fn as a stage named after it."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with stage(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,55 @@
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+_EMPTY = np.empty(0, dtype='int32')
+
+
+class TextIndex:
+    """Trigram index over the distinct values of a text column.
+
+    A substring query is resolved on the distinct values (a few thousand
+    strings) and then mapped to row positions, without scanning the rows.
+    """
+
+    def __init__(self, column: pd.Series):
+        categorical = column.astype('category').cat
+        self.values = categorical.categories
+        self._keys = [str(value).casefold() for value in self.values]
+
+        # Row positions grouped by value: rows of value i are _order[_starts[i]:_starts[i + 1]]
+        codes = categorical.codes.to_numpy()
+        present = np.flatnonzero(codes >= 0)
+        self._order = present[np.argsort(codes[present], kind='stable')]
+        self._counts = np.bincount(codes[present], minlength=len(self.values))
+        self._starts = np.concatenate([[0], np.cumsum(self._counts)[:-1]]).astype('int64')
+
+        # Trigram -> sorted ids of the values containing it
+        postings = defaultdict(list)
+        for i, key in enumerate(self._keys):
+            for gram in {key[j:j + 3] for j in range(len(key) - 2)}:
+                postings[gram].append(i)
+        self._trigrams = {gram: np.array(ids, dtype='int32') for gram, ids in postings.items()}
+
+    def search(self, query: str) -> np.ndarray:
+        """Ids of the values containing `query`, ignoring case."""
+        key = query.casefold()
+        if len(key) < 3:
+            candidates = range(len(self._keys))
+        else:
+            grams = sorted({key[j:j + 3] for j in range(len(key) - 2)},
+                           key=lambda gram: len(self._trigrams.get(gram, _EMPTY)))
+            candidates = self._trigrams.get(grams[0], _EMPTY)
+            for gram in grams[1:]:
+                if len(candidates) == 0:
+                    break
+                candidates = np.intersect1d(candidates, self._trigrams.get(gram, _EMPTY), assume_unique=True)
+        # Trigrams only narrow the candidates; confirm the actual substring
+        return np.array([i for i in candidates if key in self._keys[i]], dtype='int64')
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """Sorted row positions of the given value ids."""
+        lengths = self._counts[ids]
+        # Concatenate the _order slices of every id in one vectorized gather
+        offsets = np.repeat(self._starts[ids] - np.cumsum(lengths) + lengths, lengths)
+        return np.sort(self._order[offsets + np.arange(lengths.sum())])
@@ -1,16 +1,167 @@
 import streamlit as st
-import plotly.express as px
+import numpy as np
 import pandas as pd
+from utils.cube import POPULAR_NAME_MIN_DEATHS, count_by
+from utils.geo import DEPARTMENT_NAMES, load_departments_geojson
+from utils.io import load_aggregate_cache
+from utils.profiling import profiled, stage
+
+# plotly.express is imported inside the plot functions: it takes a second to import and is only
+# needed by the section being displayed
+
+# Major COVID waves (approximate dates, both ends included), shared by the timeline and the wave chart
+COVID_WAVES = pd.DataFrame({
+    'wave': ['1st Wave (Spring 2020)', '2nd Wave (Winter 2020-21)', '3rd Wave (Delta, Summer 2021)'],
+    'annotation': ['1st Wave', '2nd Wave', '3rd Wave (Delta)'],
+    'start': pd.to_datetime(['2020-03-15', '2020-10-15', '2021-08-01']),
+    'end': pd.to_datetime(['2020-05-15', '2021-01-15', '2021-10-01']),
+})
+OTHER_WAVE = 'Other (Outside the Waves)'
+# Average monthly deaths in France in 2015-2019 (Ined), the excess mortality baseline when
+# the 2015-2019 files were not ingested or cannot answer the filters
+INED_MONTHLY_DEATHS = 50048
+
+
+def wave_of(dates) -> pd.Categorical:
+    """COVID wave of each date (OTHER_WAVE outside the waves), in one searchsorted pass."""
+    # Edges alternate wave start / day after wave end, so dates inside a wave land in odd bins
+    edges = pd.DatetimeIndex(np.column_stack([COVID_WAVES['start'], COVID_WAVES['end'] + pd.Timedelta(days=1)]).ravel())
+    bins = edges.searchsorted(pd.DatetimeIndex(dates), side='right')
+    codes = np.where(bins % 2 == 1, (bins - 1) // 2, len(COVID_WAVES))
+    return pd.Categorical.from_codes(codes, categories=list(COVID_WAVES['wave']) + [OTHER_WAVE])
+
+
+def minmax_downsample(series: pd.Series, max_points: int) -> pd.Series:
+    """Keep the minimum and maximum of each of max_points // 2 consecutive buckets.
+
+    Peaks and troughs survive, so the downsampled line keeps the shape of the original.
+    """
+    if max_points is None or len(series) <= max_points:
+        return series
+    buckets = np.arange(len(series)) * (max_points // 2) // len(series)
+    by_bucket = pd.Series(series.to_numpy()).groupby(buckets)
+    return series.iloc[np.union1d(by_bucket.idxmin(), by_bucket.idxmax())]
+
+
+# --- Aggregates ---
+# Each chart is split into an aggregate, computed from the selection and shared by every
+# session through the aggregate cache, and a render step that only draws it.
+
+def _count(selection, keys: list) -> pd.Series:
+    """count_by() on the selection, reading the rows only when it has no cube."""
+    cube = selection.cube
+    return count_by(selection.df if cube is None else None, cube, keys)
+
+
+def aggregate_age_by_gender(selection) -> pd.Series:
+    """Deaths by sex and age, behind the KPIs and the age distribution."""
+    return _count(selection, ['sexeCategorical', 'age'])
+
+
+def aggregate_daily_deaths(selection) -> pd.Series:
+    """Deaths by day."""
+    return _count(selection, ['datedeces'])
+
+
+def aggregate_monthly_deaths(selection) -> pd.Series:
+    """Deaths by month since 2020, indexed by monthly period."""
+    daily = _count(selection, ['datedeces'])
+    daily = daily[daily.index >= pd.Timestamp('2020-01-01')]
+    return daily.groupby(daily.index.to_period('M')).sum()
+
+
+def aggregate_excess_mortality(selection):
+    """Monthly deaths since 2020 minus the baseline deaths of the same calendar month.
+
+    The baseline is the 2015-2019 average for the same filters when the
+    selection has one, otherwise the constant Ined average; returns the
+    comparison and whether the baseline came from the data.
+    """
+    comparison = aggregate_monthly_deaths(selection).reset_index(name='deces_2020_plus')
+    comparison['mois'] = comparison['datedeces'].dt.month
+    comparison['mois_deces'] = comparison['datedeces'].dt.to_timestamp()
+    baseline = selection.baseline
+    from_data = baseline is not None
+    if not from_data:
+        baseline = pd.Series(INED_MONTHLY_DEATHS, index=range(1, 13))
+    # One lookup per month, whatever the number of deaths behind the baseline
+    comparison = comparison.join(baseline.rename('baseline_avg'), on='mois')
+    comparison['surmortalite'] = comparison['deces_2020_plus'] - comparison['baseline_avg']
+    return comparison, from_data
+
+
+def aggregate_generation(selection) -> pd.Series:
+    """Deaths by birth decade."""
+    return _count(selection, ['generation'])
+
+
+def aggregate_covid_waves(selection) -> pd.DataFrame:
+    """Deaths by COVID wave and age."""
+    # Label every (date, age) count with its wave, then one grouped count per wave and age
+    counts = _count(selection, ['datedeces', 'age'])
+    waves = wave_of(counts.index.get_level_values('datedeces'))
+    plot_df = counts.groupby([waves, counts.index.get_level_values('age')], observed=True).sum()
+    return plot_df.rename_axis(['wave', 'age']).reset_index(name='deaths')
+
+
+def aggregate_departments(selection) -> pd.DataFrame:
+    """Deaths by department of death, with the department names."""
+    # Deaths by department of death (Corsica as 2A/2B, overseas departments on 3 characters)
+    dept_counts = _count(selection, ['dept_deces']).reset_index(name='deaths')
+    dept_counts.columns = ['dept_code', 'deaths']
+    dept_counts['dept_code'] = dept_counts['dept_code'].astype(str)
+    dept_counts = dept_counts[dept_counts['dept_code'].isin(list(DEPARTMENT_NAMES))]
+    dept_counts['dept_name'] = dept_counts['dept_code'].map(DEPARTMENT_NAMES)
+    return dept_counts
+
+
+def aggregate_prenoms(selection, min_count=POPULAR_NAME_MIN_DEATHS) -> pd.DataFrame:
+    """Deaths and age sum of the first names with at least min_count deaths.
+
+    Read from the popular-name statistics when the selection has them, else from the rows.
+    """
+    name_stats = selection.name_stats
+    if name_stats is None:
+        name_stats = selection.df.groupby('prenom', observed=True)['age'].agg(deaths='size', age_sum='sum')
+    return name_stats[name_stats['deaths'] >= min_count]
+
+
+AGGREGATES = {
+    'age_by_gender': aggregate_age_by_gender,
+    'daily_deaths': aggregate_daily_deaths,
+    'monthly_deaths': aggregate_monthly_deaths,
+    'excess_mortality': aggregate_excess_mortality,
+    'generation': aggregate_generation,
+    'covid_waves': aggregate_covid_waves,
+    'departments': aggregate_departments,
+    'prenoms': aggregate_prenoms,
+}
+
+
+def chart_data(chart: str, selection):
+    """Aggregate `chart` of the selection, from the aggregate cache when another rerun computed it."""
+    def compute():
+        with stage(f'aggregate {chart}'):
+            return AGGREGATES[chart](selection)
+    return load_aggregate_cache().get((chart,) + selection.key, compute)
 
 
 # basic KPIS in overview
-def plot_kpis_by_gender(df: pd.DataFrame):
+@profiled
+def plot_kpis_by_gender(selection):
     """Show basic KPIs, respecting the gender filter."""
-    total_deces = len(df)
-    age_moyen = int(df['age'].mean()) if not df.empty else 0
-    age_median = int(df['age'].median()) if not df.empty else 0
-    
-    life_exp = df.groupby('sexeCategorical')['age'].mean().round(1).to_dict()
+    counts = chart_data('age_by_gender', selection)
+    by_age = counts.groupby(level='age').sum()
+    total_deces = int(by_age.sum())
+    age_moyen, age_median = 0, 0
+    if total_deces:
+        age_moyen = int((by_age.index * by_age).sum() / total_deces)
+        # Median of the age counts: average of the two middle values, as Series.median does
+        middle = by_age.index[by_age.cumsum().searchsorted([(total_deces - 1) // 2, total_deces // 2], side='right')]
+        age_median = int(middle.to_numpy().mean())
+
+    age_sums = (counts * counts.index.get_level_values('age')).groupby(level='sexeCategorical', observed=True).sum()
+    life_exp = (age_sums / counts.groupby(level='sexeCategorical', observed=True).sum()).round(1).to_dict()
     age_homme = life_exp.get('Male', 'N/A')
     age_femme = life_exp.get('Female', 'N/A')
 
@@ -21,138 +172,117 @@ def plot_kpis_by_gender(df: pd.DataFrame):
     c4.metric("Average age Female/Male", f"{age_femme} / {age_homme} years")
 
 # age distribution by gender
-def plot_age_distribution_by_gender(df: pd.DataFrame):
+@profiled
+def plot_age_distribution_by_gender(selection):
     """Show histogram of age distribution by gender"""
+    import plotly.express as px
     st.subheader("Deaths by Age and Gender")
-    fig = px.histogram(
-        df, x='age', color='sexeCategorical', barmode='overlay', nbins=100,
+    # Binned here (one bin per year of age), so only the counts are sent to the browser
+    age_counts = chart_data('age_by_gender', selection).reset_index(name='deaths')
+    fig = px.bar(
+        age_counts, x='age', y='deaths', color='sexeCategorical', barmode='overlay',
         title="Distribution of Age at Death by Gender",
-        labels={'age': 'Age', 'sexeCategorical': 'Gender'},
+        labels={'age': 'Age', 'deaths': 'count', 'sexeCategorical': 'Gender'},
         color_discrete_map={'Male': 'royalblue', 'Female': 'pink'}
     )
     fig.update_traces(opacity=0.7)
+    fig.update_layout(bargap=0)
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_mortality_over_time(df: pd.DataFrame):
-    """Show evolution of mortality with detailed COVID waves (2020-2022 only)."""
+@profiled
+def plot_mortality_over_time(selection, period, max_points=None):
+    """Show evolution of mortality over the `period` of the data, with the COVID waves highlighted.
+
+    With max_points, long date ranges are downsampled keeping each bucket's min and max.
+    """
+    import plotly.express as px
     # Daily deaths for more granular COVID impact analysis
-    daily_deaths = df.groupby('datedeces').size().reset_index(name='count')
+    daily_deaths = minmax_downsample(chart_data('daily_deaths', selection), max_points).reset_index(name='count')
     fig = px.line(
         daily_deaths,
         x='datedeces',
         y='count',
-        title="Daily Deaths in France (2020-2022)",
+        title=f"Daily Deaths in France ({period})",
         labels={'datedeces': 'Date of Death', 'count': 'Number of Deaths'}
     )
 
     # Highlight major COVID waves (approximate dates)
-    fig.add_vrect(x0="2020-03-15", x1="2020-05-15", fillcolor="#FFADAD", opacity=0.3, line_width=0, annotation_text="1st Wave")
-    fig.add_vrect(x0="2020-10-15", x1="2021-01-15", fillcolor="#FFADAD", opacity=0.3, line_width=0, annotation_text="2nd Wave")
-    fig.add_vrect(x0="2021-08-01", x1="2021-10-01", fillcolor="#FFADAD", opacity=0.3, line_width=0, annotation_text="3rd Wave (Delta)")
+    for wave in COVID_WAVES.itertuples():
+        fig.add_vrect(x0=wave.start, x1=wave.end, fillcolor="#FFADAD", opacity=0.3, line_width=0, annotation_text=wave.annotation)
 
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_excess_mortality(df: pd.DataFrame):
-    """Calculate and show monthly excess mortality for the COVID period (2020-2022)."""
-    # Use average monthly deaths from Ined (2015-2019): 50,048
-    # Source: Institut national d'études démographiques (Ined)
-    st.warning("Warning: This chart is irrelevant if filters are applied, because the monthly average is constant.")
-    st.info("The average number of deaths per month in France between 2015 and 2019 was approximately 50,048. This was calculated by summing annual deaths from Ined and dividing by 60 months.\n\nAnnual deaths: 2015: 593,680 | 2016: 593,865 | 2017: 606,274 | 2018: 609,648 | 2019: 599,408.\n\nSource: Institut national d'études démographiques (Ined), https://www.ined.fr/en/everything_about_population/data/france/mortality-deaths/number-deaths/.")
-
-    covid_df = df[df['annee_deces'] >= 2020].copy()
-    covid_monthly = covid_df.groupby('mois_deces').size().reset_index(name='deces_2020_plus')
-    covid_monthly['mois'] = pd.to_datetime(covid_monthly['mois_deces']).dt.month
-
-    # Create baseline DataFrame
-    baseline_monthly = pd.DataFrame({
-        'mois': list(range(1, 13)),
-        'baseline_avg': [50048] * 12
-    })
-
-    comparison_df = pd.merge(covid_monthly, baseline_monthly, on='mois', how='left')
-    comparison_df['surmortalite'] = comparison_df['deces_2020_plus'] - comparison_df['baseline_avg']
+@profiled
+def plot_excess_mortality(selection):
+    """Calculate and show monthly excess mortality from 2020 on."""
+    import plotly.express as px
+    comparison_df, from_data = chart_data('excess_mortality', selection)
+    if from_data:
+        st.caption("Excess deaths are measured against the average deaths of the same calendar month in 2015-2019, "
+                   "for the same gender and age group (INSEE death files).")
+        title = "Excess Mortality Compared to the 2015-2019 Average of the Same Month"
+    else:
+        # Use average monthly deaths from Ined (2015-2019): 50,048
+        # Source: Institut national d'études démographiques (Ined)
+        st.warning("Warning: This chart is irrelevant if filters are applied, because the monthly average is constant.")
+        st.info("The average number of deaths per month in France between 2015 and 2019 was approximately 50,048. This was calculated by summing annual deaths from Ined and dividing by 60 months.\n\nAnnual deaths: 2015: 593,680 | 2016: 593,865 | 2017: 606,274 | 2018: 609,648 | 2019: 599,408.\n\nSource: Institut national d'études démographiques (Ined), https://www.ined.fr/en/everything_about_population/data/france/mortality-deaths/number-deaths/.")
+        title = "Excess Mortality Compared to 2015-2019 Monthly Average (Source: Ined)"
 
     fig = px.bar(comparison_df, x='mois_deces', y='surmortalite',
-                 title="Excess Mortality Compared to 2015-2019 Monthly Average (Source: Ined)",
+                 title=title,
                  labels={'mois_deces': 'Months', 'surmortalite': 'Excess Deaths'})
     fig.update_traces(marker_color=['red' if val > 0 else 'green' for val in comparison_df['surmortalite']])
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_deaths_by_generation(df: pd.DataFrame):
+@profiled
+def plot_deaths_by_generation(selection):
     """Analyze mortality by decade of birth."""
+    import plotly.express as px
     st.subheader("Mortality by Generation")
-    if df.empty:
+    generation_counts = chart_data('generation', selection)
+    if generation_counts.empty:
         st.info("Not enough data to display the generation analysis with the current filters.")
         return
-    df_gen = df.copy()
-    df_gen['generation'] = (df_gen['annee_naiss'] // 10) * 10
-    generation_counts = df_gen['generation'].value_counts().sort_index()
     fig = px.bar(generation_counts, x=generation_counts.index, y=generation_counts.values,
                  title="Number of Deaths by Birth Decade",
                  labels={'x': 'Birth Decade', 'y': 'Number of Deaths'})
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_prenom_analysis(df: pd.DataFrame):
+@profiled
+def plot_prenom_analysis(selection):
     """Analyze names, with handling for cases where there is little data."""
+    import plotly.express as px
     st.markdown("---")
     st.subheader("Is Name related to Age at Death ?")
     st.warning("Warning: These graphs are statistical curiosities and should not be over-interpreted.")
 
-    min_count = 500
-    prenom_counts = df['prenom'].value_counts()
-    common_prenoms = prenom_counts[prenom_counts >= min_count].index
-    df_filtered = df[df['prenom'].isin(common_prenoms)]
+    common_prenoms = chart_data('prenoms', selection)
     # If after filtering by popularity, there is no more data, we stop.
-    if df_filtered.empty:
+    if common_prenoms.empty:
         st.info("Not enough data to display the name analysis with the current filters. Try with a broader selection.")
         return
 
     col1, col2 = st.columns(2)
     with col1:
-        top_prenoms = df_filtered['prenom'].value_counts().nlargest(15).sort_values(ascending=True)
+        top_prenoms = common_prenoms['deaths'].nlargest(15).sort_values(ascending=True)
         fig = px.bar(top_prenoms, x=top_prenoms.values, y=top_prenoms.index, orientation='h', title="Top 15 Most Common Names", labels={'x': 'Number of Deaths', 'y': 'First Name'})
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
-        avg_age_by_prenom = df_filtered.groupby('prenom')['age'].mean().nsmallest(15).sort_values(ascending=False)
+        avg_age_by_prenom = (common_prenoms['age_sum'] / common_prenoms['deaths']).nsmallest(15).sort_values(ascending=False)
         fig = px.bar(avg_age_by_prenom, x=avg_age_by_prenom.values, y=avg_age_by_prenom.index, orientation='h',
                       title="Top 15 Names by Average Age at Death (Lowest)", labels={'x': 'Average Age at Death', 'y': 'First Name'})
         st.plotly_chart(fig, use_container_width=True)
 
-def plot_covid_age_impact(df: pd.DataFrame):
+@profiled
+def plot_covid_age_impact(selection):
     """
-    Shows the age distribution of deaths for each major COVID wave (2020-2022 only).
+    Shows the age distribution of deaths for each major COVID wave.
     Reveals which age groups were most affected during each wave using only available data.
     """
-    st.info("This chart shows the age distribution of deaths for each major COVID wave in France (2020-2022). It highlights which age groups were most affected during each wave, using only available data.")
-    # Define wave periods (approximate)
-    wave_periods = {
-        '1st Wave (Spring 2020)': ('2020-03-15', '2020-05-15'),
-        '2nd Wave (Winter 2020-21)': ('2020-10-15', '2021-01-15'),
-        '3rd Wave (Delta, Summer 2021)': ('2021-08-01', '2021-10-01'),
-        'Other (Rest of 2020-2022)': None
-    }
-
-    age_distributions = {}
-    for wave, period in wave_periods.items():
-        if period is not None:
-            start, end = period
-            mask = (df['datedeces'] >= pd.to_datetime(start)) & (df['datedeces'] <= pd.to_datetime(end))
-            age_distributions[wave] = df.loc[mask, 'age'].value_counts().sort_index()
-        else:
-            # All other dates not in defined waves
-            mask = ~(
-                ((df['datedeces'] >= pd.to_datetime('2020-03-15')) & (df['datedeces'] <= pd.to_datetime('2020-05-15')))
-                | ((df['datedeces'] >= pd.to_datetime('2020-10-15')) & (df['datedeces'] <= pd.to_datetime('2021-01-15')))
-                | ((df['datedeces'] >= pd.to_datetime('2021-08-01')) & (df['datedeces'] <= pd.to_datetime('2021-10-01')))
-            )
-            age_distributions[wave] = df.loc[mask, 'age'].value_counts().sort_index()
-
-    # Prepare data for plotting
-    plot_df = pd.DataFrame()
-    for wave, dist in age_distributions.items():
-        temp = pd.DataFrame({'age': dist.index, 'deaths': dist.values, 'wave': wave})
-        plot_df = pd.concat([plot_df, temp], ignore_index=True)
+    import plotly.express as px
+    st.info("This chart shows the age distribution of deaths for each major COVID wave in France. It highlights which age groups were most affected during each wave, using only available data.")
+    plot_df = chart_data('covid_waves', selection)
 
     # Plot
     fig = px.line(
@@ -160,71 +290,39 @@ def plot_covid_age_impact(df: pd.DataFrame):
         x='age',
         y='deaths',
         color='wave',
-        title="Age Distribution of Deaths by COVID Wave (2020-2022)",
+        title="Age Distribution of Deaths by COVID Wave",
         labels={'age': 'Age at Death', 'deaths': 'Number of Deaths', 'wave': 'COVID Wave'}
     )
     fig.update_layout(xaxis_title='Age at Death', yaxis_title='Number of Deaths')
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_deaths_by_department_map(df: pd.DataFrame):
+@profiled
+def plot_deaths_by_department_map(selection, period):
     """
     Displays a choropleth map of France showing deaths by department.
-    Uses the first 2 digits of lieudeces code to determine department.
+    Uses the department of the lieudeces commune code.
     """
+    import plotly.express as px
     st.subheader(" Geographic Distribution: Deaths by Department of Death")
     
-    # Extract department code from lieudeces (first 2 digits)
-    df_map = df.copy()
-    df_map['dept_code'] = df_map['lieudeces'].astype(str).str[:2]
-    
-    # Filter out invalid department codes (only keep 01-95 and 2A, 2B for Corsica)
-    valid_depts = [f"{i:02d}" for i in range(1, 96)]
-    df_map = df_map[df_map['dept_code'].isin(valid_depts)]
-    
-    # Count deaths by department
-    dept_counts = df_map['dept_code'].value_counts().reset_index()
-    dept_counts.columns = ['dept_code', 'deaths']
-    
-    # Add department names (simplified mapping for major departments)
-    dept_names = {
-        '01': 'Ain', '02': 'Aisne', '03': 'Allier', '04': 'Alpes-de-Haute-Provence',
-        '05': 'Hautes-Alpes', '06': 'Alpes-Maritimes', '07': 'Ardèche', '08': 'Ardennes',
-        '09': 'Ariège', '10': 'Aube', '11': 'Aude', '12': 'Aveyron', '13': 'Bouches-du-Rhône',
-        '14': 'Calvados', '15': 'Cantal', '16': 'Charente', '17': 'Charente-Maritime',
-        '18': 'Cher', '19': 'Corrèze', '21': 'Côte-d\'Or', '22': 'Côtes-d\'Armor',
-        '23': 'Creuse', '24': 'Dordogne', '25': 'Doubs', '26': 'Drôme', '27': 'Eure',
-        '28': 'Eure-et-Loir', '29': 'Finistère', '30': 'Gard', '31': 'Haute-Garonne',
-        '32': 'Gers', '33': 'Gironde', '34': 'Hérault', '35': 'Ille-et-Vilaine',
-        '36': 'Indre', '37': 'Indre-et-Loire', '38': 'Isère', '39': 'Jura', '40': 'Landes',
-        '41': 'Loir-et-Cher', '42': 'Loire', '43': 'Haute-Loire', '44': 'Loire-Atlantique',
-        '45': 'Loiret', '46': 'Lot', '47': 'Lot-et-Garonne', '48': 'Lozère', '49': 'Maine-et-Loire',
-        '50': 'Manche', '51': 'Marne', '52': 'Haute-Marne', '53': 'Mayenne', '54': 'Meurthe-et-Moselle',
-        '55': 'Meuse', '56': 'Morbihan', '57': 'Moselle', '58': 'Nièvre', '59': 'Nord',
-        '60': 'Oise', '61': 'Orne', '62': 'Pas-de-Calais', '63': 'Puy-de-Dôme',
-        '64': 'Pyrénées-Atlantiques', '65': 'Hautes-Pyrénées', '66': 'Pyrénées-Orientales',
-        '67': 'Bas-Rhin', '68': 'Haut-Rhin', '69': 'Rhône', '70': 'Haute-Saône',
-        '71': 'Saône-et-Loire', '72': 'Sarthe', '73': 'Savoie', '74': 'Haute-Savoie',
-        '75': 'Paris', '76': 'Seine-Maritime', '77': 'Seine-et-Marne', '78': 'Yvelines',
-        '79': 'Deux-Sèvres', '80': 'Somme', '81': 'Tarn', '82': 'Tarn-et-Garonne',
-        '83': 'Var', '84': 'Vaucluse', '85': 'Vendée', '86': 'Vienne', '87': 'Haute-Vienne',
-        '88': 'Vosges', '89': 'Yonne', '90': 'Territoire de Belfort', '91': 'Essonne',
-        '92': 'Hauts-de-Seine', '93': 'Seine-Saint-Denis', '94': 'Val-de-Marne', '95': 'Val-d\'Oise'
-    }
-    
-    dept_counts['dept_name'] = dept_counts['dept_code'].map(dept_names).fillna(dept_counts['dept_code'])
-    
-    # Create choropleth map using Plotly's built-in France geometry
+    dept_counts = chart_data('departments', selection)
+
+    # Bundled, pre-simplified geometry
+    geojson = load_departments_geojson()
+    if geojson is None:
+        st.warning("Department geometry not found: assets/departements.geojson is missing.")
+        return
     fig = px.choropleth(
         dept_counts,
         locations='dept_code',
-        geojson='https://france-geojson.gregoiredavid.fr/repo/departements.geojson',
+        geojson=geojson,
         featureidkey='properties.code',
         color='deaths',
         hover_name='dept_name',
         hover_data={'dept_code': True, 'deaths': ':,'},
         color_continuous_scale='YlOrRd',
         labels={'deaths': 'Number of Deaths'},
-        title='Deaths by Department of Death (2020-2022)'
+        title=f'Deaths by Department of Death ({period})'
     )
     
     # Update map layout to focus on France